@@ -2,10 +2,24 @@ from __future__ import division
 
 import b2
 from models import *
+from profiler import *
+from race import *
+from solver import *
+from spatial import *
 from utils import *
 
+from array import array
+from itertools import izip
 import math
-from pyglet.gl import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# How far the anchor of a motor may be from the anchor of the revolute joint
+# that it is compiled into.
+motor_joint_tolerance = 0.25
 
 class Actor(object):
     def __init__(self, model):
@@ -15,7 +29,14 @@ class Actor(object):
         pass
 
 class LevelActor(Actor):
-    def __init__(self, level_model):
+    # With native_joints, springs and motors are compiled into Box2D joints
+    # where the model allows, instead of applying forces from Python. With
+    # implicit_springs, spring forces are integrated implicitly, which keeps
+    # stiff springs stable at large time steps. With adaptive_solver, a
+    # SolverController chooses the solver iterations of every step, instead
+    # of the fixed 10 and 10.
+    def __init__(self, level_model, native_joints=False,
+                 implicit_springs=False, adaptive_solver=False):
         super(LevelActor, self).__init__(level_model)
         self.color = 0, 0, 0, 1
         self.background_color = 1, 1, 1, 1
@@ -23,74 +44,80 @@ class LevelActor(Actor):
         aabb.lowerBound = level_model.lower_bound
         aabb.upperBound = level_model.upper_bound
         self.world = b2.b2World(aabb, level_model.gravity, True)
+        self.lower_bound = level_model.lower_bound
+        self.upper_bound = level_model.upper_bound
+        self.gravity = level_model.gravity
         self.start = level_model.start
         self.goal = level_model.goal
+        self.native_joints = native_joints
+        self.implicit_springs = implicit_springs
         self.extra_joint_actors = []
-        self.key_names = {
-            pyglet.window.key.DOWN: 'down',
-            pyglet.window.key.LEFT: 'left',
-            pyglet.window.key.RIGHT: 'right',
-            pyglet.window.key.SPACE: 'space',
-        }
+        self.spring_actors = []
+        self.spring_system = None
+        self.motor_actors = []
+        self.revolute_joints = []
+        self.camera_actor = None
         self.key_press_bindings = {}
         self.key_release_bindings = {}
         self.z = 1
+        self.bodies = {}
+        self.step_index = 0
+        self.profiler = null_profiler
+        self.solver_controller = None
+        if adaptive_solver:
+            self.solver_controller = \
+                SolverController(level_model.min_iterations,
+                                 level_model.max_iterations)
 
         for body_model in level_model.body_models:
-            BodyActor(self, body_model)
-        for joint_model in level_model.joint_models:
+            self.bodies[body_model] = BodyActor(self, body_model).body
+        bodies = [self.bodies[b] for b in level_model.body_models]
+        self.static_bodies = [b for b in bodies if b.IsStatic()]
+        self.dynamic_bodies = [b for b in bodies if not b.IsStatic()]
+        bind_joints(level_model)
+
+        # Motors go last, so that they can find the revolute joints that
+        # they drive.
+        for joint_model in sorted(level_model.joint_models,
+                                  key=lambda j: isinstance(j, MotorModel)):
             self.create_joint(joint_model)
-
-        self.circle_line_loop_display_list = CircleDisplayList()
-        self.circle_polygon_display_list = CircleDisplayList(mode=GL_POLYGON)
-        self.display_lists = {}
+        self.race_state = RaceState(self, level_model)
+        if numpy is not None and self.spring_actors:
+            self.spring_system = SpringSystem(self.spring_actors,
+                                              implicit_springs)
         self.camera = 0, 0
 
-    def get_bodies_at_point(self, point):
-        segment = b2.b2Segment()
-        segment.p1 = tuple(point)
-        segment.p2 = tuple(point)
-        count, shapes = self.world.Raycast(segment, 1000, True, None)
-        return list(set(s.GetBody() for s in shapes))
-
-    def get_top_bodies_at_point(self, point, body_count=2):
-        def key(body):
-            return body.userData.z
-        return sorted(self.get_bodies_at_point(point), key=key)[-body_count:]
-
-    def get_top_body_at_point(self, point):
-        def key(body):
-            return body.userData.z
-        return max(self.get_bodies_at_point(point), key=key)
+    def get_body(self, body_model):
+        if body_model is None:
+            return self.world.GetGroundBody()
+        return self.bodies[body_model]
 
     def create_joint(self, joint_model):
         if isinstance(joint_model, RevoluteJointModel):
-            bodies = self.get_top_bodies_at_point(joint_model.anchor)
-            if len(bodies) == 1:
-                body_1 = bodies[0]
-                body_2 = self.world.GetGroundBody()
-            else:
-                body_1, body_2 = bodies
+            body_1 = self.get_body(joint_model.body_model_1)
+            body_2 = self.get_body(joint_model.body_model_2)
             joint_def = b2.b2RevoluteJointDef()
             joint_def.Initialize(body_1, body_2, tuple(joint_model.anchor))
-            self.world.CreateJoint(joint_def)
+            joint = self.world.CreateJoint(joint_def).getAsType()
+            self.revolute_joints.append((joint_model, joint))
         elif isinstance(joint_model, DistanceJointModel):
-            body_1 = self.get_top_body_at_point(joint_model.anchor_1)
-            body_2 = self.get_top_body_at_point(joint_model.anchor_2)
+            body_1 = self.get_body(joint_model.body_model_1)
+            body_2 = self.get_body(joint_model.body_model_2)
             joint_def = b2.b2DistanceJointDef()
             joint_def.Initialize(body_1, body_2, tuple(joint_model.anchor_1),
                                  tuple(joint_model.anchor_2))
             self.world.CreateJoint(joint_def)
         elif isinstance(joint_model, PrismaticJointModel):
-            body_1 = self.get_top_body_at_point(joint_model.anchor_1)
-            body_2 = self.get_top_body_at_point(joint_model.anchor_2)
+            body_1 = self.get_body(joint_model.body_model_1)
+            body_2 = self.get_body(joint_model.body_model_2)
             joint_def = b2.b2PrismaticJointDef()
             axis = tuple(joint_model.anchor_2 - joint_model.anchor_1)
             joint_def.Initialize(body_1, body_2, tuple(joint_model.anchor_1),
                                  axis)
             self.world.CreateJoint(joint_def)
         elif isinstance(joint_model, SpringModel):
-            SpringActor(self, joint_model)
+            if not self.native_joints or not self.create_spring_joint(joint_model):
+                SpringActor(self, joint_model)
         elif isinstance(joint_model, MotorModel):
             MotorActor(self, joint_model)
         elif isinstance(joint_model, CameraModel):
@@ -98,85 +125,114 @@ class LevelActor(Actor):
         else:
             assert False
 
-    def step(self, dt):
-        for joint_actor in self.extra_joint_actors:
-            joint_actor.step(dt)
-        self.world.Step(dt, 10, 10)
+    def create_spring_joint(self, spring_model):
+        # A soft distance joint with the frequency and damping ratio of the
+        # spring, taken over the reduced mass of its bodies. Unlike
+        # SpringActor, the force is not clamped. Returns None for springs
+        # that cannot be expressed this way.
+        body_1 = self.get_body(spring_model.body_model_1)
+        body_2 = self.get_body(spring_model.body_model_2)
+        inverse_mass = sum(1 / body.GetMass() for body in (body_1, body_2)
+                           if body.GetMass())
+        length = abs(spring_model.anchor_2 - spring_model.anchor_1)
+        if spring_model.spring_constant <= 0 or not inverse_mass or not length:
+            return None
+        mass = 1 / inverse_mass
+        angular_frequency = math.sqrt(spring_model.spring_constant / mass)
+        joint_def = b2.b2DistanceJointDef()
+        joint_def.Initialize(body_1, body_2, tuple(spring_model.anchor_1),
+                             tuple(spring_model.anchor_2))
+        joint_def.frequencyHz = angular_frequency / (2 * math.pi)
+        joint_def.dampingRatio = (spring_model.damping /
+                                  (2 * mass * angular_frequency))
+
+        # Springs do not keep their bodies from colliding.
+        joint_def.collideConnected = True
+        return self.world.CreateJoint(joint_def)
+
+    def get_motor_joint(self, motor_model):
+        # The revolute joint at the anchor of the motor that is attached to
+        # its body, and the sign of the joint speed that turns the body
+        # counter-clockwise. None if there is no such joint.
+        x, y = motor_model.anchor
+        for joint_model, joint in self.revolute_joints:
+            joint_x, joint_y = joint_model.anchor
+            if (math.hypot(joint_x - x, joint_y - y) <= motor_joint_tolerance
+                and motor_model.body_model in (joint_model.body_model_1,
+                                               joint_model.body_model_2)):
+                if motor_model.body_model is joint_model.body_model_2:
+                    return joint, 1
+                else:
+                    return joint, -1
+        return None
 
-    def draw(self):
-        for body in self.world.bodyList:
-            glPushMatrix()
+    def step(self, dt):
+        if self.solver_controller is None:
+            self.step_world(dt, 10, 10)
+        else:
+            self.solver_controller.step(self, dt)
+        self.step_index += 1
+
+    def step_world(self, dt, velocity_iterations, position_iterations):
+        # Box2D clears the forces after every step, so the joint actors run
+        # before each substep.
+        with self.profiler.phase('joint-actors'):
+            for joint_actor in self.extra_joint_actors:
+                joint_actor.step(dt)
+            if self.spring_system is not None:
+                self.spring_system.step(dt)
+            else:
+                for spring_actor in self.spring_actors:
+                    spring_actor.step(dt)
+        with self.profiler.phase('world-step'):
+            self.world.Step(dt, velocity_iterations, position_iterations)
+
+    def save_snapshot(self):
+        # Flat array of the step index, the camera, the position, angle and
+        # velocities of every dynamic body, and the throttle of every motor.
+        snapshot = array('d', [self.step_index])
+        snapshot.extend(self.camera)
+        for body in self.dynamic_bodies:
             x, y = body.position.tuple()
-            glTranslatef(x, y, 0)
-            glRotatef(body.angle * 180 / math.pi, 0, 0, 1)
-            if body not in self.display_lists:
-                self.display_lists[body] = glGenLists(1)
-                glNewList(self.display_lists[body], GL_COMPILE)
-                self.draw_body(body)
-                glEndList()
-            glCallList(self.display_lists[body])
-            glPopMatrix()
-
-    def draw_body(self, body):
-        for shape in body.shapeList:
-            color = shape.userData
-            if color is None:
-                color = self.color
-            glColor4f(*color)
-            if isinstance(shape, b2.b2PolygonShape):
-                glBegin(GL_POLYGON)
-                for x, y in shape.vertices:
-                    glVertex2f(x, y)
-                glEnd()
-            elif isinstance(shape, b2.b2CircleShape):
-                self.circle_polygon_display_list.draw(shape.localPosition.tuple(),
-                                                      shape.radius)
-
-    def debug_draw(self):
-        for body in self.world.bodyList:
-            self.debug_draw_body(body)
-        for joint in self.world.jointList:
-            if isinstance(joint, b2.b2DistanceJoint):
-                glBegin(GL_LINES)
-                glVertex2f(*joint.GetAnchor1().tuple())
-                glVertex2f(*joint.GetAnchor2().tuple())
-                glEnd()
-        for joint_actor in self.extra_joint_actors:
-            if isinstance(joint_actor, SpringActor):
-                glBegin(GL_LINES)
-                glVertex2f(*joint_actor.anchor_1.tuple())
-                glVertex2f(*joint_actor.anchor_2.tuple())
-                glEnd()
-
-    def debug_draw_body(self, body):
-        glPushMatrix()
-        x, y = body.position.tuple()
-        glTranslatef(x, y, 0)
-        glRotatef(body.angle * 180 / math.pi, 0, 0, 1)
-        for shape in body.shapeList:
-            if isinstance(shape, b2.b2PolygonShape):
-                glBegin(GL_LINE_LOOP)
-                for x, y in shape.vertices:
-                    glVertex2f(x, y)
-                glEnd()
-            elif isinstance(shape, b2.b2CircleShape):
-                self.circle_line_loop_display_list.draw(shape.localPosition.tuple(),
-                                                        shape.radius)
-        glPopMatrix()
-
-    def on_key_press(self, symbol, modifiers):
-        name = self.key_names.get(symbol)
-        if name is not None:
-            func = self.key_press_bindings.get(name)
-            if func is not None:
-                func()
-
-    def on_key_release(self, symbol, modifiers):
-        name = self.key_names.get(symbol)
-        if name is not None:
-            func = self.key_release_bindings.get(name)
-            if func is not None:
-                func()
+            linear_velocity_x, linear_velocity_y = body.linearVelocity.tuple()
+            snapshot.extend((x, y, body.angle, linear_velocity_x,
+                             linear_velocity_y, body.angularVelocity))
+        for motor_actor in self.motor_actors:
+            snapshot.append(motor_actor.throttle)
+        return snapshot
+
+    def restore_snapshot(self, snapshot):
+        # Contacts and solver caches are not part of the snapshot, so the
+        # steps after a restore may differ slightly from the original ones.
+        self.step_index = int(snapshot[0])
+        self.camera = snapshot[1], snapshot[2]
+        self.race_state.rewind(self.step_index)
+        if self.solver_controller is not None:
+            self.solver_controller.reset()
+        i = 3
+        for body in self.dynamic_bodies:
+            (x, y, angle, linear_velocity_x, linear_velocity_y,
+             angular_velocity) = snapshot[i:i + 6]
+            body.SetXForm(b2.b2Vec2(x, y), angle)
+            body.SetLinearVelocity(b2.b2Vec2(linear_velocity_x,
+                                             linear_velocity_y))
+            body.SetAngularVelocity(angular_velocity)
+            body.WakeUp()
+            i += 6
+        for motor_actor in self.motor_actors:
+            motor_actor.set_throttle(int(snapshot[i]))
+            i += 1
+        assert i == len(snapshot)
+
+    def press_key(self, name):
+        func = self.key_press_bindings.get(name)
+        if func is not None:
+            func()
+
+    def release_key(self, name):
+        func = self.key_release_bindings.get(name)
+        if func is not None:
+            func()
 
 class BodyActor(Actor):
     def __init__(self, level_actor, body_model):
@@ -211,20 +267,23 @@ class JointActor(Actor):
 class SpringActor(JointActor):
     def __init__(self, level_actor, spring_model):
         super(SpringActor, self).__init__(spring_model)
+        self.level_actor = level_actor
         anchor_1 = tuple(spring_model.anchor_1)
         anchor_2 = tuple(spring_model.anchor_2)
-        self.body_1 = level_actor.get_top_body_at_point(anchor_1)
-        self.body_2 = level_actor.get_top_body_at_point(anchor_2)
+        self.body_1 = level_actor.get_body(spring_model.body_model_1)
+        self.body_2 = level_actor.get_body(spring_model.body_model_2)
         self._anchor_1 = self.body_1.GetLocalPoint(anchor_1)
         self._anchor_2 = self.body_2.GetLocalPoint(anchor_2)
         self.spring_constant = spring_model.spring_constant
         self.damping = spring_model.damping
         self.max_force = 1000 # spring_model.max_force
         self.length = abs(spring_model.anchor_2 - spring_model.anchor_1)
-        level_actor.extra_joint_actors.append(self)
+        level_actor.spring_actors.append(self)
 
     def delete(self):
-        self.level_actor.extra_joint_actors.remove(self)
+        self.level_actor.spring_actors.remove(self)
+        if self.level_actor.spring_system is not None:
+            self.level_actor.spring_system.update()
 
     @property
     def anchor_1(self):
@@ -237,18 +296,27 @@ class SpringActor(JointActor):
     def step(self, dt):
         direction = self.anchor_2 - self.anchor_1
         length = direction.Normalize()
-
-        # Calculate spring force.
-        spring_force = self.spring_constant * (length - self.length)
-
-        # Calculate damping force.
         relative_velocity = (self.get_linear_velocity_in_point(self.body_2,
                                                                self.anchor_2) -
                              self.get_linear_velocity_in_point(self.body_1,
                                                                self.anchor_1))
-        damping_force = self.damping * b2.b2Dot(relative_velocity, direction)
-
-        force = spring_force + damping_force
+        stretch = length - self.length
+        stretch_velocity = b2.b2Dot(relative_velocity, direction)
+        if self.level_actor.implicit_springs:
+            # Backward Euler along the spring: the force that gives the
+            # bodies the velocity that they would have at the end of the
+            # step.
+            inverse_mass = (self.get_inverse_mass(self.body_1, self.anchor_1,
+                                                  direction) +
+                            self.get_inverse_mass(self.body_2, self.anchor_2,
+                                                  direction))
+            damping = self.damping + dt * self.spring_constant
+            force = ((self.spring_constant * stretch +
+                      damping * stretch_velocity) /
+                     (1 + dt * damping * inverse_mass))
+        else:
+            force = (self.spring_constant * stretch +
+                     self.damping * stretch_velocity)
         force = sign(force) * min(abs(force), self.max_force)
         self.body_1.ApplyForce(force * direction, self.anchor_1)
         self.body_2.ApplyForce(-force * direction, self.anchor_2)
@@ -258,34 +326,187 @@ class SpringActor(JointActor):
         return (body.linearVelocity +
                 b2.b2Vec2(-offset.y, offset.x) * body.angularVelocity)
 
+    def get_inverse_mass(self, body, point, direction):
+        # Inverse of the mass that a force along direction in point meets.
+        mass = body.GetMass()
+        if not mass:
+            return 0
+        inverse_mass = 1 / mass
+        inertia = body.GetInertia()
+        if inertia:
+            offset = point - body.GetWorldCenter()
+            cross = offset.x * direction.y - offset.y * direction.x
+            inverse_mass += cross ** 2 / inertia
+        return inverse_mass
+
+class SpringSystem(object):
+    # Computes the forces of all springs in a level with one batched NumPy
+    # pass per step, using the same model as SpringActor.step. Only reading
+    # the body states and applying the forces is done per spring.
+
+    def __init__(self, spring_actors, implicit=False):
+        self.spring_actors = spring_actors
+        self.implicit = implicit
+        self.update()
+
+    def update(self):
+        self.bodies = []
+        body_indices = {}
+        def get_body_index(body):
+            if body not in body_indices:
+                body_indices[body] = len(self.bodies)
+                self.bodies.append(body)
+            return body_indices[body]
+        spring_actors = self.spring_actors
+        self.body_indices_1 = numpy.array([get_body_index(s.body_1)
+                                           for s in spring_actors], dtype=int)
+        self.body_indices_2 = numpy.array([get_body_index(s.body_2)
+                                           for s in spring_actors], dtype=int)
+        self.local_anchors_1 = numpy.array([s._anchor_1.tuple()
+                                            for s in spring_actors])
+        self.local_anchors_2 = numpy.array([s._anchor_2.tuple()
+                                            for s in spring_actors])
+        self.lengths = numpy.array([s.length for s in spring_actors])
+        self.spring_constants = numpy.array([s.spring_constant
+                                             for s in spring_actors])
+        self.dampings = numpy.array([s.damping for s in spring_actors])
+        self.max_forces = numpy.array([s.max_force for s in spring_actors])
+        self.inverse_masses = numpy.array([get_inverse(body.GetMass())
+                                           for body in self.bodies])
+        self.inverse_inertias = numpy.array([get_inverse(body.GetInertia())
+                                             for body in self.bodies])
+
+    def step(self, dt):
+        if not self.spring_actors:
+            return
+        body_states = numpy.array([body.position.tuple() + (body.angle,) +
+                                   body.GetWorldCenter().tuple() +
+                                   body.linearVelocity.tuple() +
+                                   (body.angularVelocity,)
+                                   for body in self.bodies])
+        body_states_1 = body_states[self.body_indices_1]
+        body_states_2 = body_states[self.body_indices_2]
+        anchors_1, velocities_1 = self.get_anchors(body_states_1,
+                                                   self.local_anchors_1)
+        anchors_2, velocities_2 = self.get_anchors(body_states_2,
+                                                   self.local_anchors_2)
+        directions = anchors_2 - anchors_1
+        lengths = numpy.sqrt((directions ** 2).sum(axis=1))
+        nonzero = lengths > 1e-9
+        directions[nonzero] /= lengths[nonzero, numpy.newaxis]
+        directions[~nonzero] = 0
+
+        # Calculate spring and damping forces.
+        stretches = lengths - self.lengths
+        relative_velocities = velocities_2 - velocities_1
+        stretch_velocities = (relative_velocities * directions).sum(axis=1)
+        if self.implicit:
+            inverse_masses = (self.get_inverse_masses(self.body_indices_1,
+                                                      body_states_1,
+                                                      anchors_1, directions) +
+                              self.get_inverse_masses(self.body_indices_2,
+                                                      body_states_2,
+                                                      anchors_2, directions))
+            dampings = self.dampings + dt * self.spring_constants
+            forces = ((self.spring_constants * stretches +
+                       dampings * stretch_velocities) /
+                      (1 + dt * dampings * inverse_masses))
+        else:
+            forces = (self.spring_constants * stretches +
+                      self.dampings * stretch_velocities)
+        numpy.clip(forces, -self.max_forces, self.max_forces, forces)
+
+        force_vectors = forces[:, numpy.newaxis] * directions
+        for spring_actor, (x, y), anchor_1, anchor_2 in \
+                izip(self.spring_actors, force_vectors.tolist(),
+                     anchors_1.tolist(), anchors_2.tolist()):
+            spring_actor.body_1.ApplyForce(b2.b2Vec2(x, y),
+                                           b2.b2Vec2(*anchor_1))
+            spring_actor.body_2.ApplyForce(b2.b2Vec2(-x, -y),
+                                           b2.b2Vec2(*anchor_2))
+
+    @staticmethod
+    def get_anchors(body_states, local_anchors):
+        # World positions and linear velocities of anchors given in body
+        # coordinates.
+        (x, y, angle, center_x, center_y, linear_velocity_x,
+         linear_velocity_y, angular_velocity) = body_states.T
+        local_x, local_y = local_anchors.T
+        cos_angle = numpy.cos(angle)
+        sin_angle = numpy.sin(angle)
+        anchor_x = x + cos_angle * local_x - sin_angle * local_y
+        anchor_y = y + sin_angle * local_x + cos_angle * local_y
+        velocity_x = (linear_velocity_x -
+                      angular_velocity * (anchor_y - center_y))
+        velocity_y = (linear_velocity_y +
+                      angular_velocity * (anchor_x - center_x))
+        return (numpy.column_stack((anchor_x, anchor_y)),
+                numpy.column_stack((velocity_x, velocity_y)))
+
+    def get_inverse_masses(self, body_indices, body_states, anchors,
+                           directions):
+        # See SpringActor.get_inverse_mass.
+        offsets = anchors - body_states[:, 3:5]
+        crosses = (offsets[:, 0] * directions[:, 1] -
+                   offsets[:, 1] * directions[:, 0])
+        return (self.inverse_masses[body_indices] +
+                self.inverse_inertias[body_indices] * crosses ** 2)
+
 class MotorActor(JointActor):
     def __init__(self, level_actor, motor_model):
         super(MotorActor, self).__init__(motor_model)
         self.level_actor = level_actor
-        self.body = level_actor.get_top_body_at_point(tuple(motor_model.anchor))
+        self.body = level_actor.get_body(motor_model.body_model)
         self.torque = motor_model.torque
         self.damping = motor_model.damping
         self.clockwise_key = motor_model.clockwise_key
         self.counter_clockwise_key = motor_model.counter_clockwise_key
         self.throttle = 0
+
+        # Without damping, the motor has no top speed to give a joint motor.
+        self.joint = None
+        self.joint_sign = 0
+        if level_actor.native_joints and self.damping:
+            motor_joint = level_actor.get_motor_joint(motor_model)
+            if motor_joint is not None:
+                self.joint, self.joint_sign = motor_joint
+
         self.level_actor.key_press_bindings[self.clockwise_key] = self.decrement_throttle
         self.level_actor.key_release_bindings[self.clockwise_key] = self.increment_throttle
         self.level_actor.key_press_bindings[self.counter_clockwise_key] = self.increment_throttle
         self.level_actor.key_release_bindings[self.counter_clockwise_key] = self.decrement_throttle
-        self.level_actor.extra_joint_actors.append(self)
+        self.level_actor.motor_actors.append(self)
+        if self.joint is None:
+            self.level_actor.extra_joint_actors.append(self)
 
     def delete(self):
         self.level_actor.key_press_bindings[self.clockwise_key] = None
         self.level_actor.key_release_bindings[self.clockwise_key] = None
         self.level_actor.key_press_bindings[self.counter_clockwise_key] = None
         self.level_actor.key_release_bindings[self.counter_clockwise_key] = None
-        self.level_actor.extra_joint_actors.remove(self)
+        self.level_actor.motor_actors.remove(self)
+        if self.joint is None:
+            self.level_actor.extra_joint_actors.remove(self)
 
     def increment_throttle(self):
-        self.throttle += 1
+        self.set_throttle(self.throttle + 1)
 
     def decrement_throttle(self):
-        self.throttle -= 1
+        self.set_throttle(self.throttle - 1)
+
+    def set_throttle(self, throttle):
+        self.throttle = throttle
+        if self.joint is not None:
+            # The joint motor drives towards the speed where the torque and
+            # the damping of the motor balance.
+            self.joint.EnableMotor(bool(throttle))
+            self.joint.SetMaxMotorTorque(abs(throttle) * self.torque)
+            self.joint.SetMotorSpeed(self.joint_sign * throttle *
+                                     self.torque / self.damping)
+
+            # Changing the motor does not wake sleeping bodies.
+            self.joint.GetBody1().WakeUp()
+            self.joint.GetBody2().WakeUp()
 
     def step(self, dt):
         if self.throttle:
@@ -297,11 +518,13 @@ class CameraActor(JointActor):
     def __init__(self, level_actor, camera_model):
         super(CameraActor, self).__init__(camera_model)
         self.level_actor = level_actor
-        self.body = level_actor.get_top_body_at_point(tuple(camera_model.anchor))
+        self.body = level_actor.get_body(camera_model.body_model)
         self.level_actor.extra_joint_actors.append(self)
+        self.level_actor.camera_actor = self
 
     def delete(self):
         self.level_actor.extra_joint_actors.remove(self)
+        self.level_actor.camera_actor = None
 
     def step(self, dt):
         self.level_actor.camera = self.body.GetWorldCenter().tuple()
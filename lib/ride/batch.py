@@ -0,0 +1,157 @@
+from __future__ import division
+
+from monitor import *
+import settings
+from simulation import *
+
+from multiprocessing import Pool
+from optparse import OptionParser
+import sys
+
+# The step indices of the input script and the step count are in steps of
+# dt seconds.
+class Job(object):
+    def __init__(self, level_path, vehicle_path, input_script=(),
+                 step_count=3600, native_joints=False,
+                 implicit_springs=False, adaptive_solver=False, monitor=True,
+                 monitor_options=(), dt=settings.dt):
+        self.level_path = level_path
+        self.vehicle_path = vehicle_path
+        self.input_script = list(input_script)
+        self.step_count = step_count
+        self.native_joints = native_joints
+        self.implicit_springs = implicit_springs
+        self.adaptive_solver = adaptive_solver
+        self.monitor = monitor
+        self.monitor_options = dict(monitor_options)
+        self.dt = dt
+
+# The reason is why the run ended: 'finished', 'step-limit', or the reason
+# code of the run monitor.
+class Result(object):
+    def __init__(self, job, finish_time=None, positions=(), crashed=False,
+                 reason=None):
+        self.job = job
+        self.finish_time = finish_time
+        self.positions = dict(positions)
+        self.crashed = crashed
+        self.reason = reason
+
+def load_input_script(path):
+    input_script = []
+    for line in open(path):
+        line = line.split('#')[0].strip()
+        if line:
+            step_index, name, action = line.split()
+            assert action in ('press', 'release')
+            input_script.append((int(step_index), name, action == 'press'))
+    return input_script
+
+def run_job(job):
+    level_actor = load_level_actor(job.level_path, job.vehicle_path,
+                                   job.native_joints, job.implicit_springs,
+                                   job.adaptive_solver)
+    simulation = Simulation(level_actor, job.dt, job.input_script)
+    monitor = None
+    if job.monitor:
+        monitor = RunMonitor(level_actor, simulation.dt,
+                             **job.monitor_options)
+    reason = None
+    while reason is None:
+        if simulation.finish_step_index is not None:
+            reason = 'finished'
+        elif simulation.step_index >= job.step_count:
+            reason = 'step-limit'
+        else:
+            simulation.step()
+            if monitor is not None:
+                reason = monitor.check()
+    positions = []
+    crashed = False
+    for body in level_actor.world.bodyList:
+        if body.userData is not None and not body.IsStatic():
+            x, y = body.position.tuple()
+            positions.append((body.userData.id, (x, y, body.angle)))
+            crashed = crashed or body.IsFrozen()
+    return Result(job, simulation.finish_time, positions, crashed, reason)
+
+def run_jobs(jobs, processes=None):
+    pool = Pool(processes)
+    try:
+        for result in pool.imap_unordered(run_job, jobs):
+            yield result
+    finally:
+        pool.terminate()
+
+def main():
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('-l', '--level', action='append', dest='level_paths',
+                      default=[], help='level SVG file (repeatable)')
+    parser.add_option('-v', '--vehicle', action='append',
+                      dest='vehicle_paths', default=[],
+                      help='vehicle SVG file (repeatable)')
+    parser.add_option('-i', '--input', dest='input_path',
+                      help='input script: "<step> <key> press|release" '
+                           'lines, with steps of the time step')
+    parser.add_option('-s', '--steps', type='int', dest='step_count',
+                      help='maximum number of physics steps per run '
+                           '(default: one minute)')
+    parser.add_option('--dt', type='float', dest='dt', default=settings.dt,
+                      help='physics time step in seconds, e.g. 0.0333 for '
+                           'cheaper runs with implicit springs')
+    parser.add_option('-j', '--processes', type='int', dest='processes',
+                      help='number of worker processes')
+    parser.add_option('-n', '--native-joints', action='store_true',
+                      dest='native_joints', default=settings.native_joints,
+                      help='compile springs and motors into Box2D joints')
+    parser.add_option('-m', '--implicit-springs', action='store_true',
+                      dest='implicit_springs',
+                      default=settings.implicit_springs,
+                      help='integrate springs implicitly, for large time '
+                           'steps')
+    parser.add_option('-a', '--adaptive-solver', action='store_true',
+                      dest='adaptive_solver',
+                      default=settings.adaptive_solver,
+                      help='adapt solver iterations to the scene')
+    parser.add_option('-M', '--no-monitor', action='store_false',
+                      dest='monitor', default=True,
+                      help='run stuck, flipped and out-of-bounds vehicles '
+                           'to the step limit')
+    parser.add_option('--stuck-time', type='float', dest='max_stuck_time',
+                      help='seconds without progress before a run is '
+                           'stuck')
+    parser.add_option('--flip-time', type='float', dest='max_flip_time',
+                      help='seconds upside down before a run is flipped')
+    options, args = parser.parse_args()
+    if args or not options.level_paths or not options.vehicle_paths:
+        parser.error('at least one level and one vehicle are required')
+    if options.dt <= 0:
+        parser.error('the time step must be positive')
+    if options.step_count is None:
+        options.step_count = int(round(60 / options.dt))
+    monitor_options = {}
+    for name in 'max_stuck_time', 'max_flip_time':
+        if getattr(options, name) is not None:
+            monitor_options[name] = getattr(options, name)
+    input_script = ()
+    if options.input_path:
+        input_script = load_input_script(options.input_path)
+    jobs = [Job(level_path, vehicle_path, input_script, options.step_count,
+                options.native_joints, options.implicit_springs,
+                options.adaptive_solver, options.monitor, monitor_options,
+                options.dt)
+            for level_path in options.level_paths
+            for vehicle_path in options.vehicle_paths]
+    for result in run_jobs(jobs, options.processes):
+        if result.finish_time is None:
+            finish_time = '-'
+        else:
+            finish_time = '%.3f' % result.finish_time
+        sys.stdout.write('%s\t%s\t%s\t%s\t%s\n' %
+                         (result.job.level_path, result.job.vehicle_path,
+                          finish_time, 'crashed' if result.crashed else 'ok',
+                          result.reason))
+        sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+from __future__ import division
+
+from actors import *
+import cache
+from generator import *
+import settings
+from simulation import *
+import svg
+
+import glob
+import json
+from optparse import OptionParser
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+root_dir = os.path.dirname(os.path.abspath(__file__))
+level_paths = sorted(glob.glob(os.path.join(root_dir, 'levels', '*.svg')))
+vehicle_paths = sorted(glob.glob(os.path.join(root_dir, 'vehicles', '*.svg')))
+
+# Hold the throttle from the first step, so that vehicles keep moving and
+# do not fall asleep.
+input_events = [(0, 'space', True)]
+
+def get_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def measure(func, repeat_count=5, setup=None):
+    # Best wall time of a few runs, in seconds. If setup is given, it is
+    # called before every run, untimed, and its result is passed to func.
+    best_time = None
+    for _ in xrange(repeat_count):
+        args = () if setup is None else (setup(),)
+        start_time = time.time()
+        func(*args)
+        duration = time.time() - start_time
+        if best_time is None or duration < best_time:
+            best_time = duration
+    return best_time
+
+def load_model(level_path, vehicle_path, loader=svg):
+    level_model = loader.load_level(level_path)
+    loader.load_vehicle(vehicle_path, level_model)
+    return level_model
+
+def benchmark_loading(results, level_path, vehicle_path):
+    pair = '%s/%s' % (get_name(level_path), get_name(vehicle_path))
+    results['load-level/%s' % get_name(level_path)] = \
+        measure(lambda: svg.load_level(level_path))
+    results['load-vehicle/%s' % get_name(vehicle_path)] = \
+        measure(lambda: svg.load_vehicle(vehicle_path, LevelModel()))
+    load_model(level_path, vehicle_path, cache)
+    results['load-cached/%s' % pair] = \
+        measure(lambda: load_model(level_path, vehicle_path, cache))
+    # Binding the joints changes the model, so every run needs a fresh one.
+    results['create-level-actor/%s' % pair] = \
+        measure(LevelActor,
+                setup=lambda: load_model(level_path, vehicle_path))
+
+def benchmark_stepping(results, level_path, vehicle_path, step_count):
+    pair = '%s/%s' % (get_name(level_path), get_name(vehicle_path))
+    level_model = load_model(level_path, vehicle_path)
+    for name, kwargs in (('steps-per-second', {}),
+                         ('steps-per-second-native-joints',
+                          dict(native_joints=True)),
+                         ('steps-per-second-implicit-springs',
+                          dict(implicit_springs=True)),
+                         ('steps-per-second-adaptive-solver',
+                          dict(adaptive_solver=True))):
+        duration = None
+        for _ in xrange(3):
+            simulation = Simulation(LevelActor(level_model, **kwargs),
+                                    input_events=input_events)
+            run_duration = measure(lambda: simulation.run(step_count), 1)
+            if duration is None or run_duration < duration:
+                duration = run_duration
+        results['%s/%s' % (name, pair)] = step_count / duration
+
+def benchmark_drawing(results, level_path, vehicle_path, frame_count):
+    # Imported here so that the other benchmarks run without a display.
+    import pyglet
+    from pyglet import gl
+    from views import LevelView
+
+    pair = '%s/%s' % (get_name(level_path), get_name(vehicle_path))
+    window = pyglet.window.Window(width=800, height=600, visible=False)
+    level_view = None
+    try:
+        simulation = Simulation(LevelActor(load_model(level_path,
+                                                      vehicle_path)),
+                                input_events=input_events)
+        scale = window.height / settings.camera_height
+        level_view = LevelView(simulation.level_actor, scale)
+        half_width = window.width / scale / 2
+        half_height = settings.camera_height / 2
+        def draw_frames():
+            # Step between frames, but only time the drawing. Returns the
+            # drawing time in seconds.
+            duration = 0
+            for _ in xrange(frame_count):
+                simulation.step()
+                start_time = time.time()
+                window.switch_to()
+                gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+                gl.glPushMatrix()
+                gl.glTranslatef(window.width // 2, window.height // 2, 0)
+                gl.glScalef(scale, scale, scale)
+                camera_x, camera_y = simulation.level_actor.camera
+                gl.glTranslatef(-camera_x, -camera_y, 0)
+                level_view.draw((camera_x - half_width,
+                                 camera_y - half_height,
+                                 camera_x + half_width,
+                                 camera_y + half_height))
+                gl.glPopMatrix()
+                gl.glFinish()
+                duration += time.time() - start_time
+            return duration
+        duration = min(draw_frames() for _ in xrange(3))
+        results['frames-per-second/%s' % pair] = frame_count / duration
+    finally:
+        if level_view is not None:
+            level_view.delete()
+        window.close()
+
+def benchmark_scaling(results, body_count, step_count):
+    generator = StressLevelGenerator(body_count, body_count // 2,
+                                     max(100, body_count / 5))
+    level_model = generator.create_level_model()
+    results['create-level-actor/stress-%d' % body_count] = \
+        measure(LevelActor, 1, setup=generator.create_level_model)
+    simulation = Simulation(LevelActor(level_model))
+    duration = measure(lambda: simulation.run(step_count), 1)
+    results['steps-per-second/stress-%d' % body_count] = \
+        step_count / duration
+
+def compare(results, baseline, tolerance):
+    # Print the ratio of every result to its baseline. Larger is worse for
+    # times and better for rates. Returns the names of regressions.
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        ratio = results[name] / baseline[name]
+        worse = ratio < 1 - tolerance if '-per-' in name else \
+                ratio > 1 + tolerance
+        if worse:
+            regressions.append(name)
+        sys.stdout.write('%-50s %8.2fx%s\n' % (name, ratio,
+                                                '  REGRESSION' if worse
+                                                else ''))
+    return regressions
+
+def main():
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('-s', '--steps', type='int', dest='step_count',
+                      default=600, help='physics steps per stepping run')
+    parser.add_option('-f', '--frames', type='int', dest='frame_count',
+                      default=300, help='frames per drawing run')
+    parser.add_option('-n', '--no-drawing', action='store_false',
+                      dest='drawing', default=True,
+                      help='skip drawing benchmarks, for machines without '
+                           'a display')
+    parser.add_option('-b', '--bodies', dest='body_counts', default='',
+                      help='comma-separated body counts of generated stress '
+                           'levels to measure scaling with')
+    parser.add_option('-o', '--output', dest='output_path',
+                      help='write results as JSON to this file')
+    parser.add_option('-c', '--compare', dest='baseline_path',
+                      help='compare with results from an earlier run')
+    parser.add_option('-t', '--tolerance', type='float', dest='tolerance',
+                      default=0.1, help='allowed slowdown before a result '
+                                        'counts as a regression')
+    options, args = parser.parse_args()
+    if args:
+        parser.error('unexpected arguments')
+
+    # Measure cached loading against a cache of our own.
+    settings.cache_dir = tempfile.mkdtemp(prefix='ride-benchmark-')
+    results = {}
+    try:
+        for level_path in level_paths:
+            for vehicle_path in vehicle_paths:
+                benchmark_loading(results, level_path, vehicle_path)
+                benchmark_stepping(results, level_path, vehicle_path,
+                                   options.step_count)
+                if options.drawing:
+                    benchmark_drawing(results, level_path, vehicle_path,
+                                      options.frame_count)
+        for body_count in options.body_counts.split(','):
+            if body_count:
+                benchmark_scaling(results, int(body_count),
+                                  options.step_count)
+    finally:
+        shutil.rmtree(settings.cache_dir, ignore_errors=True)
+
+    for name in sorted(results):
+        if '-per-' in name:
+            sys.stdout.write('%-50s %10.1f\n' % (name, results[name]))
+        else:
+            sys.stdout.write('%-50s %8.3f ms\n' % (name,
+                                                    1000 * results[name]))
+    if options.output_path:
+        with open(options.output_path, 'w') as file_:
+            json.dump(results, file_, indent=2, sort_keys=True)
+    if options.baseline_path:
+        with open(options.baseline_path) as file_:
+            baseline = json.load(file_)
+        sys.stdout.write('\n')
+        if compare(results, baseline, options.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
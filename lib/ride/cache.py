@@ -0,0 +1,75 @@
+from __future__ import division
+
+from models import *
+import settings
+import svg
+from utils import *
+
+import cPickle as pickle
+import errno
+import hashlib
+import os
+
+# Bump whenever the models or the SVG loader change what they produce, so
+# that stale cache files are ignored.
+cache_version = 5
+
+def get_cache_path(path, *key):
+    digest = hashlib.sha1()
+    digest.update(repr((cache_version, key)))
+    with open(path, 'rb') as file_:
+        digest.update(file_.read())
+    return os.path.join(settings.cache_dir, digest.hexdigest() + '.pickle')
+
+def read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as file_:
+            return pickle.load(file_)
+    except IOError:
+        return None
+    except Exception, e:
+        log('read_cache(): ignoring broken cache file %s: %s' %
+            (cache_path, e))
+        return None
+
+def write_cache(cache_path, model):
+    # The cache is only an optimization, so failing to write it is logged
+    # rather than raised.
+    temp_path = '%s.%d' % (cache_path, os.getpid())
+    try:
+        try:
+            os.makedirs(os.path.dirname(cache_path))
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        with open(temp_path, 'wb') as file_:
+            pickle.dump(model, file_, pickle.HIGHEST_PROTOCOL)
+        os.rename(temp_path, cache_path)
+    except (OSError, IOError), e:
+        log('write_cache(): cannot write cache file %s: %s' % (cache_path, e))
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+def load_level(path):
+    cache_path = get_cache_path(path)
+    level_model = read_cache(cache_path)
+    if level_model is None:
+        level_model = svg.load_level(path)
+        write_cache(cache_path, level_model)
+    return level_model
+
+def load_vehicle(path, level_model):
+    # The vehicle is placed at the level start, so the start is part of the
+    # cache key.
+    start = tuple(level_model.start)
+    cache_path = get_cache_path(path, start)
+    vehicle_model = read_cache(cache_path)
+    if vehicle_model is None:
+        vehicle_model = LevelModel()
+        vehicle_model.start = start
+        svg.load_vehicle(path, vehicle_model)
+        write_cache(cache_path, vehicle_model)
+    level_model.body_models.extend(vehicle_model.body_models)
+    level_model.joint_models.extend(vehicle_model.joint_models)
@@ -0,0 +1,212 @@
+from __future__ import division
+
+from models import *
+from svg import create_stroke_shape_models, parse_color
+
+from euclid import *
+from optparse import OptionParser
+import random
+
+# Bodies are stacked in columns above a bumpy terrain. A joint links a body
+# to the one above it in the same column, at the middle of the small band
+# where the two overlap. Joined bodies share a negative group index, so
+# they do not collide with each other.
+column_spacing = 2
+row_spacing = 0.9
+body_size = 1
+terrain_segment_length = 5
+terrain_height = 10
+terrain_stroke_width = 1
+
+terrain_color = '#2b6896'
+body_colors = '#e9133b', '#ceff00', '#000000'
+
+class StressLevelGenerator(object):
+    def __init__(self, body_count=100, joint_count=50, terrain_length=1000,
+                 spring_density=0.5, dynamic_fraction=0.5, seed=0):
+        self.random = random.Random(seed)
+        self.terrain_length = terrain_length
+        self.width = terrain_length + 20
+        column_count = max(1, int(terrain_length // column_spacing))
+        row_count = (body_count + column_count - 1) // column_count
+        self.height = 2 * terrain_height + row_count * row_spacing + 20
+
+        # Terrain polyline, in world coordinates.
+        self.terrain = []
+        x = 10
+        while x < 10 + terrain_length:
+            y = 10 + self.random.uniform(0, terrain_height)
+            self.terrain.append((x, y))
+            x += terrain_segment_length
+        self.terrain.append((10 + terrain_length, 10))
+        base_y = 10 + terrain_height + 2
+
+        # Bodies as (kind, center, density, color), where kind is 'box' or
+        # 'circle'.
+        self.bodies = []
+        for i in xrange(body_count):
+            column, row = i % column_count, i // column_count
+            center = (10 + column_spacing * (column + 0.5),
+                      base_y + row_spacing * row)
+            kind = self.random.choice(('box', 'circle'))
+            density = int(self.random.random() < dynamic_fraction)
+            color = self.random.choice(body_colors)
+            self.bodies.append((kind, center, density, color))
+
+        # Joints as (kind, anchor_1, anchor_2), where kind is 'spring' or
+        # 'revolute-joint'. Springs connect the centers of both bodies.
+        self.joints = []
+        self.group_indices = {}
+        joint_count = min(joint_count, max(0, body_count - column_count))
+        for i in self.random.sample(xrange(body_count - column_count),
+                                    joint_count):
+            lower_x, lower_y = self.bodies[i][1]
+            upper_x, upper_y = self.bodies[i + column_count][1]
+            if self.random.random() < spring_density:
+                self.joints.append(('spring', (lower_x, lower_y),
+                                    (upper_x, upper_y)))
+            else:
+                anchor = lower_x, (lower_y + upper_y) / 2
+                self.joints.append(('revolute-joint', anchor, anchor))
+            self.group_indices[i] = -1
+            self.group_indices[i + column_count] = -1
+
+        self.start = 15, base_y
+        self.goal = 5 + terrain_length, base_y
+
+    def create_level_model(self):
+        level_model = LevelModel()
+        level_model.lower_bound = 0, 0
+        level_model.upper_bound = self.width, self.height
+        level_model.gravity = 0, -10
+        level_model.start = Point2(*self.start)
+        level_model.goal = Point2(*self.goal)
+
+        body_model = BodyModel()
+        body_model.id = 'terrain'
+        body_model.shape_models.extend(create_stroke_shape_models(
+            list(self.terrain), terrain_stroke_width / 2,
+            color=parse_color(terrain_color)))
+        level_model.body_models.append(body_model)
+
+        for i, (kind, (x, y), density, color) in enumerate(self.bodies):
+            body_model = BodyModel()
+            body_model.id = '%s%d' % (kind, i)
+            kwargs = dict(density=density, color=parse_color(color),
+                          group_index=self.group_indices.get(i, 0))
+            half_size = body_size / 2
+            if kind == 'box':
+                # Same vertex order as parse_rect_element.
+                vertices = [(x - half_size, y + half_size),
+                            (x - half_size, y - half_size),
+                            (x + half_size, y - half_size),
+                            (x + half_size, y + half_size)]
+                shape_model = PolygonModel(vertices, **kwargs)
+            else:
+                shape_model = CircleModel(Point2(x, y), half_size, **kwargs)
+            body_model.shape_models.append(shape_model)
+            level_model.body_models.append(body_model)
+
+        for kind, anchor_1, anchor_2 in self.joints:
+            if kind == 'spring':
+                joint_model = SpringModel(anchor_1=Point2(*anchor_1),
+                                          anchor_2=Point2(*anchor_2),
+                                          spring_constant=100, damping=5)
+            else:
+                joint_model = RevoluteJointModel(anchor=Point2(*anchor_1))
+            level_model.joint_models.append(joint_model)
+        return level_model
+
+    def write_svg(self, path):
+        # Write the level as an Inkscape-style SVG that svg.load_level
+        # accepts. One SVG unit is one world unit, with y pointing down.
+        def point(x, y):
+            return '%r,%r' % (x, self.height - y)
+        def marker(id, x, y, description):
+            lines.append('    <path sodipodi:type="star" id="%s" '
+                         'sodipodi:cx="%r" sodipodi:cy="%r" '
+                         'style="fill:none;stroke:none">'
+                         '<desc>%s</desc></path>' %
+                         (id, x, self.height - y, description))
+        lines = []
+        lines.append('<?xml version="1.0" encoding="UTF-8" standalone="no"?>')
+        lines.append('<svg xmlns:dc="http://purl.org/dc/elements/1.1/" '
+                     'xmlns:cc="http://creativecommons.org/ns#" '
+                     'xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" '
+                     'xmlns="http://www.w3.org/2000/svg" '
+                     'xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/'
+                     'sodipodi-0.dtd" '
+                     'xmlns:inkscape="http://www.inkscape.org/namespaces/'
+                     'inkscape" width="%r" height="%r" version="1.1">' %
+                     (self.width, self.height))
+        lines.append('  <metadata><rdf:RDF><cc:Work><dc:description>'
+                     'width: %r;\ngravity: 10;</dc:description></cc:Work>'
+                     '</rdf:RDF></metadata>' % self.width)
+        lines.append('  <g inkscape:label="Layer 1" inkscape:groupmode="layer" '
+                     'id="layer1">')
+        marker('start', self.start[0], self.start[1], 'type: start;')
+        marker('goal', self.goal[0], self.goal[1], 'type: goal;')
+        lines.append('    <path id="terrain" style="fill:none;stroke:%s;'
+                     'stroke-width:%r" d="M %s" />' %
+                     (terrain_color, terrain_stroke_width,
+                      ' L '.join(point(x, y) for x, y in self.terrain)))
+        for i, (kind, (x, y), density, color) in enumerate(self.bodies):
+            description = 'density: %d;' % density
+            if i in self.group_indices:
+                description += '\ngroup-index: %d;' % self.group_indices[i]
+            half_size = body_size / 2
+            if kind == 'box':
+                lines.append('    <rect id="box%d" style="fill:%s;stroke:none" '
+                             'x="%r" y="%r" width="%r" height="%r">'
+                             '<desc>%s</desc></rect>' %
+                             (i, color, x - half_size,
+                              self.height - y - half_size, body_size,
+                              body_size, description))
+            else:
+                lines.append('    <path sodipodi:type="arc" id="circle%d" '
+                             'style="fill:%s;stroke:none" sodipodi:cx="%r" '
+                             'sodipodi:cy="%r" sodipodi:rx="%r" '
+                             'sodipodi:ry="%r"><desc>%s</desc></path>' %
+                             (i, color, x, self.height - y, half_size,
+                              half_size, description))
+        for i, (kind, anchor_1, anchor_2) in enumerate(self.joints):
+            if kind == 'spring':
+                lines.append('    <path id="spring%d" style="fill:none;'
+                             'stroke:#ceff00" d="M %s L %s">'
+                             '<desc>type: spring;\nspring-constant: 100;\n'
+                             'damping: 5;</desc></path>' %
+                             (i, point(*anchor_1), point(*anchor_2)))
+            else:
+                marker('joint%d' % i, anchor_1[0], anchor_1[1],
+                       'type: revolute-joint;')
+        lines.append('  </g>')
+        lines.append('</svg>')
+        with open(path, 'w') as file_:
+            file_.write('\n'.join(lines) + '\n')
+
+def main():
+    parser = OptionParser(usage='%prog [options] output.svg')
+    parser.add_option('-b', '--bodies', type='int', dest='body_count',
+                      default=100)
+    parser.add_option('-j', '--joints', type='int', dest='joint_count',
+                      default=50)
+    parser.add_option('-l', '--length', type='float', dest='terrain_length',
+                      default=1000, help='terrain length in world units')
+    parser.add_option('-s', '--spring-density', type='float',
+                      dest='spring_density', default=0.5,
+                      help='fraction of joints that are springs')
+    parser.add_option('-d', '--dynamic-fraction', type='float',
+                      dest='dynamic_fraction', default=0.5,
+                      help='fraction of bodies that are dynamic')
+    parser.add_option('-r', '--seed', type='int', dest='seed', default=0)
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error('expected one output file')
+    generator = StressLevelGenerator(options.body_count, options.joint_count,
+                                     options.terrain_length,
+                                     options.spring_density,
+                                     options.dynamic_fraction, options.seed)
+    generator.write_svg(args[0])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+from __future__ import division
+
+import math
+import pyglet
+from pyglet.gl import *
+
+circle_vertex_counts = 8, 16, 32, 64, 128
+unit_circle_vertices = {}
+
+def get_circle_vertex_count(pixel_radius, tolerance=0.5):
+    # The fewest vertices that keep the polygon within tolerance pixels of
+    # the circle.
+    for vertex_count in circle_vertex_counts:
+        if pixel_radius * (1 - math.cos(math.pi / vertex_count)) <= tolerance:
+            return vertex_count
+    return circle_vertex_counts[-1]
+
+def get_circle_vertices(center=(0, 0), radius=1, vertex_count=100):
+    unit_vertices = unit_circle_vertices.get(vertex_count)
+    if unit_vertices is None:
+        unit_vertices = []
+        for i in xrange(vertex_count):
+            angle = 2 * math.pi * i / vertex_count
+            unit_vertices.append((math.cos(angle), math.sin(angle)))
+        unit_circle_vertices[vertex_count] = unit_vertices
+    x, y = center
+    return [(x + radius * u, y + radius * v) for u, v in unit_vertices]
+
+class CircleDisplayList(object):
+    def __init__(self, vertex_count=100, mode=GL_LINE_LOOP):
+        assert vertex_count >= 1
+        self.display_list = glGenLists(1)
+        assert self.display_list
+        glNewList(self.display_list, GL_COMPILE)
+        glBegin(mode)
+        for x, y in get_circle_vertices(vertex_count=vertex_count):
+            glVertex2f(x, y)
+        glEnd()
+        glEndList()
+
+    def delete(self):
+        if self.display_list:
+            glDeleteLists(self.display_list, 1)
+            self.display_list = 0
+
+    def draw(self, center=(0, 0), radius=1):
+        assert self.display_list
+        x, y = center
+        if x == 0 and y == 0 and radius == 1:
+            glCallList(self.display_list)
+        else:
+            glPushMatrix()
+            glTranslatef(x, y, 0)
+            glScalef(radius, radius, 1)
+            glCallList(self.display_list)
+            glPopMatrix()
+
+def save_screenshot(name='screenshot.png', format='RGB'):
+    image = pyglet.image.get_buffer_manager().get_color_buffer().image_data
+    image.format = format
+    image.save(name)
@@ -1,9 +1,12 @@
 from __future__ import division
 
-from actors import *
+from graphics import *
+from profiler import *
+from replay import *
 import settings
-import svg
+from simulation import *
 from utils import *
+from views import *
 
 import pyglet
 from pyglet.gl import *
@@ -43,22 +46,88 @@ class GameScreen(Screen):
     def __init__(self, window):
         super(GameScreen, self).__init__(window)
         self.clock_display = pyglet.clock.ClockDisplay()
-        self.time = 0
-        self.world_time = 0
-        level_model = svg.load_level('lib/ride/levels/bumps.svg')
-        svg.load_vehicle('lib/ride/vehicles/buggy.svg', level_model)
-        self.level_actor = LevelActor(level_model)
-        pyglet.clock.schedule_interval(self.step, settings.dt)
+        self.clock = SimulationClock()
+        self.level_path = 'lib/ride/levels/bumps.svg'
+        self.vehicle_path = 'lib/ride/vehicles/buggy.svg'
+        self.profiler = Profiler(settings.profile)
+        self.load_level()
+        self.key_names = {
+            pyglet.window.key.DOWN: 'down',
+            pyglet.window.key.LEFT: 'left',
+            pyglet.window.key.RIGHT: 'right',
+            pyglet.window.key.SPACE: 'space',
+        }
+        self.held_key_names = []
+        self.profile_label = pyglet.text.Label(color=(0, 0, 0, 255), x=10,
+                                               anchor_y='top')
+        self.time_label = pyglet.text.Label(color=(0, 0, 0, 255),
+                                            anchor_x='right', anchor_y='top')
+        self.window_flip = window.flip
+        window.flip = self.flip
+        pyglet.clock.schedule(self.step)
+        if settings.profile:
+            # Rebuilding the label is slow enough to show up in the
+            # profile, so only do it once per second.
+            pyglet.clock.schedule_interval(self.update_profile_label, 1)
 
     def delete(self):
         pyglet.clock.unschedule(self.step)
+        pyglet.clock.unschedule(self.update_profile_label)
+        self.window.flip = self.window_flip
+        self.level_view.delete()
+        if settings.profile_path:
+            self.profiler.dump(settings.profile_path)
+        if settings.replay_path:
+            save_replay(self.replay, settings.replay_path)
         super(GameScreen, self).delete()
 
+    def load_level(self):
+        self.level_actor = load_level_actor(self.level_path,
+                                            self.vehicle_path)
+        self.level_actor.profiler = self.profiler
+        solver_controller = self.level_actor.solver_controller
+        if solver_controller is not None and not settings.replay_path:
+            # The time budget makes the run depend on the speed of the
+            # machine, so it is left out when recording a replay.
+            solver_controller.time_budget = settings.solver_time_budget
+        self.start_snapshot = self.level_actor.save_snapshot()
+        self.replay = Replay(self.level_path, self.vehicle_path,
+                             self.clock.dt, (), self.level_actor.native_joints,
+                             self.level_actor.implicit_springs,
+                             solver_controller is not None)
+        self.replay_recorder = ReplayRecorder(self.level_actor, self.replay)
+        scale = self.window.height / settings.camera_height
+        self.level_view = LevelView(self.level_actor, scale)
+        self.level_view.profiler = self.profiler
+
+    def restart(self):
+        if settings.replay_path:
+            # Restoring a snapshot keeps the contacts and warm starting of
+            # the world, so the run would no longer match its replay, which
+            # is played from a freshly loaded level.
+            self.level_view.delete()
+            self.load_level()
+        else:
+            self.level_actor.restore_snapshot(self.start_snapshot)
+            self.level_view.save_transforms()
+            del self.replay.events[:]
+        # Press the held keys again, so that their releases are balanced.
+        for name in self.held_key_names:
+            self.replay_recorder.press_key(name)
+
+    def flip(self):
+        # Time the buffer swap and close the frame that step() opened.
+        with self.profiler.phase('flip'):
+            self.window_flip()
+        self.profiler.end_frame()
+
     def step(self, dt):
-        self.time += dt
-        while self.world_time + settings.dt <= self.time:
-            self.world_time += settings.dt
-            self.level_actor.step(settings.dt)
+        self.profiler.begin_frame()
+        step_count = self.clock.advance(dt)
+        for i in xrange(step_count):
+            if i == step_count - 1:
+                self.level_view.save_transforms()
+            self.level_actor.step(self.clock.dt)
 
     def on_draw(self):
         glClearColor(*self.level_actor.background_color)
@@ -68,26 +137,61 @@ class GameScreen(Screen):
         glTranslatef(self.window.width // 2, self.window.height // 2, 0)
         scale = self.window.height / settings.camera_height
         glScalef(scale, scale, scale)
-        camera_x, camera_y = self.level_actor.camera
+        alpha = self.clock.alpha
+        camera_x, camera_y = self.level_view.get_camera(alpha)
         glTranslatef(-camera_x, -camera_y, 0)
         if settings.debug:
-            self.level_actor.debug_draw()
+            self.level_view.debug_draw()
         else:
-            self.level_actor.draw()
+            half_width = self.window.width / scale / 2
+            half_height = settings.camera_height / 2
+            self.level_view.draw((camera_x - half_width,
+                                  camera_y - half_height,
+                                  camera_x + half_width,
+                                  camera_y + half_height), alpha)
         glPopMatrix()
+        self.draw_time()
         if settings.fps:
             self.clock_display.draw()
+        if settings.profile:
+            self.profile_label.y = self.window.height - 10
+            self.profile_label.draw()
         return pyglet.event.EVENT_HANDLED
 
+    def update_profile_label(self, dt):
+        self.profile_label.text = '  '.join('%s %.2f ms' % (name, 1000 * t)
+                                            for name, t in
+                                            self.profiler.get_averages())
+
+    def draw_time(self):
+        # The race time, which stops at the finish.
+        step_index = self.level_actor.race_state.finish_step_index
+        if step_index is None:
+            step_index = self.level_actor.step_index
+        text = '%.2f' % (step_index * self.clock.dt)
+        if text != self.time_label.text:
+            self.time_label.text = text
+        self.time_label.x = self.window.width - 10
+        self.time_label.y = self.window.height - 10
+        self.time_label.draw()
+
     def on_key_press(self, symbol, modifiers):
         if symbol == pyglet.window.key.ESCAPE:
             self.delete()
         elif symbol == pyglet.window.key.F12:
             save_screenshot('ride-screenshot.png')
-        else:
-            self.level_actor.on_key_press(symbol, modifiers)
+        elif symbol == pyglet.window.key.BACKSPACE:
+            self.restart()
+        elif symbol in self.key_names:
+            name = self.key_names[symbol]
+            self.held_key_names.append(name)
+            self.replay_recorder.press_key(name)
         return pyglet.event.EVENT_HANDLED
 
     def on_key_release(self, symbol, modifiers):
-        self.level_actor.on_key_release(symbol, modifiers)
+        if symbol in self.key_names:
+            name = self.key_names[symbol]
+            if name in self.held_key_names:
+                self.held_key_names.remove(name)
+            self.replay_recorder.release_key(name)
         return pyglet.event.EVENT_HANDLED
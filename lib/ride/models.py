@@ -1,8 +1,20 @@
+from array import array
+
+# Large generated levels have hundreds of thousands of models, so the model
+# classes use slots, and polygon vertices are packed into a flat array of
+# doubles.
+
 class Model(object):
+    __slots__ = 'id',
+
     def __init__(self, id=None):
         self.id = id
 
 class LevelModel(Model):
+    __slots__ = ('lower_bound', 'upper_bound', 'gravity', 'start', 'goal',
+                 'checkpoints', 'min_iterations', 'max_iterations',
+                 'body_models', 'joint_models')
+
     def __init__(self):
         super(LevelModel, self).__init__()
         self.lower_bound = -100, -100
@@ -10,15 +22,24 @@ class LevelModel(Model):
         self.gravity = 0, -10
         self.start = -50, 0
         self.goal = 50, 0
+        self.checkpoints = []
+
+        # Solver iteration floor and ceiling, for the adaptive solver.
+        self.min_iterations = 4
+        self.max_iterations = 20
         self.body_models = []
         self.joint_models = []
 
 class BodyModel(Model):
+    __slots__ = 'shape_models',
+
     def __init__(self):
         super(BodyModel, self).__init__()
         self.shape_models = []
 
 class ShapeModel(Model):
+    __slots__ = 'density', 'friction', 'restitution', 'group_index', 'color'
+
     def __init__(self, density=0, friction=0.5, restitution=0.5, group_index=0,
                  color=(0, 0, 0, 1)):
         super(ShapeModel, self).__init__()
@@ -26,24 +47,40 @@ class ShapeModel(Model):
         self.friction = friction
         self.restitution = restitution
         self.group_index = group_index
-        self.color = color
+        self.color = tuple(color)
 
 class CircleModel(ShapeModel):
+    __slots__ = 'center', 'radius'
+
     def __init__(self, center=(0, 0), radius=1, **kwargs):
         super(CircleModel, self).__init__(**kwargs)
         self.center = center
         self.radius = radius
 
 class PolygonModel(ShapeModel):
+    __slots__ = 'vertex_array',
+
     def __init__(self, vertices=(), **kwargs):
         super(PolygonModel, self).__init__(**kwargs)
-        self.vertices = []
-        self.vertices[:] = vertices
+        self.vertices = vertices
+
+    @property
+    def vertices(self):
+        return zip(self.vertex_array[0::2], self.vertex_array[1::2])
+
+    @vertices.setter
+    def vertices(self, vertices):
+        self.vertex_array = array('d')
+        for x, y in vertices:
+            self.vertex_array.append(x)
+            self.vertex_array.append(y)
 
 class JointModel(Model):
-    pass
+    __slots__ = ()
 
 class RevoluteJointModel(JointModel):
+    __slots__ = 'body_model_1', 'body_model_2', 'anchor'
+
     def __init__(self, body_model_1=None, body_model_2=None, anchor=(0, 0)):
         super(RevoluteJointModel, self).__init__()
         self.body_model_1 = body_model_1
@@ -51,6 +88,8 @@ class RevoluteJointModel(JointModel):
         self.anchor = anchor
 
 class DistanceJointModel(JointModel):
+    __slots__ = 'body_model_1', 'body_model_2', 'anchor_1', 'anchor_2'
+
     def __init__(self, body_model_1=None, body_model_2=None, anchor_1=(0, 0),
                  anchor_2=(0, 0)):
         super(DistanceJointModel, self).__init__()
@@ -60,6 +99,8 @@ class DistanceJointModel(JointModel):
         self.anchor_2 = anchor_2
 
 class PrismaticJointModel(JointModel):
+    __slots__ = 'body_model_1', 'body_model_2', 'anchor_1', 'anchor_2'
+
     def __init__(self, body_model_1=None, body_model_2=None, anchor_1=(0, 0),
                  anchor_2=(0, 0)):
         super(PrismaticJointModel, self).__init__()
@@ -69,6 +110,9 @@ class PrismaticJointModel(JointModel):
         self.anchor_2 = anchor_2
 
 class MotorModel(JointModel):
+    __slots__ = ('body_model', 'anchor', 'torque', 'damping', 'clockwise_key',
+                 'counter_clockwise_key')
+
     def __init__(self, body_model=None, anchor=(0, 0), torque=1, damping=0,
                  clockwise_key=None, counter_clockwise_key=None):
         super(MotorModel, self).__init__()
@@ -80,6 +124,9 @@ class MotorModel(JointModel):
         self.counter_clockwise_key = counter_clockwise_key
 
 class SpringModel(JointModel):
+    __slots__ = ('body_model_1', 'body_model_2', 'anchor_1', 'anchor_2',
+                 'spring_constant', 'damping')
+
     def __init__(self, body_model_1=None, body_model_2=None, anchor_1=(0, 0),
                  anchor_2=(0, 0), spring_constant=1, damping=0):
         super(SpringModel, self).__init__()
@@ -91,6 +138,8 @@ class SpringModel(JointModel):
         self.damping = damping
 
 class CameraModel(JointModel):
+    __slots__ = 'body_model', 'anchor'
+
     def __init__(self, body_model=None, anchor=(0, 0)):
         super(CameraModel, self).__init__()
         self.body_model = body_model
@@ -0,0 +1,59 @@
+from __future__ import division
+
+import settings
+
+import math
+
+# Ends runs that can no longer finish. Every check_interval steps, the body
+# that the camera follows is tested for leaving the level bounds, lying
+# upside down and slow for max_flip_time seconds, and making less than
+# min_progress of forward progress in max_stuck_time seconds. check() returns
+# the reason code of the first of these, or None. Levels without a camera
+# are not monitored.
+class RunMonitor(object):
+    def __init__(self, level_actor, dt=settings.dt, check_interval=15,
+                 max_stuck_time=5, min_progress=0.5, max_flip_time=2,
+                 max_flip_angle=0.6 * math.pi, max_flip_speed=1):
+        self.level_actor = level_actor
+        self.check_interval = check_interval
+        self.max_stuck_step_count = int(max_stuck_time / dt)
+        self.min_progress = min_progress
+        self.max_flip_step_count = int(max_flip_time / dt)
+        self.max_flip_angle = max_flip_angle
+        self.max_flip_speed = max_flip_speed
+        self.progress = None
+        self.progress_step_index = level_actor.step_index
+        self.flip_step_index = None
+
+    def check(self):
+        level_actor = self.level_actor
+        step_index = level_actor.step_index
+        if (level_actor.camera_actor is None or
+            step_index % self.check_interval):
+            return None
+        body = level_actor.camera_actor.body
+        x, y = body.position.tuple()
+        lower_x, lower_y = level_actor.lower_bound
+        upper_x, upper_y = level_actor.upper_bound
+        if (body.IsFrozen() or not lower_x <= x <= upper_x or
+            not lower_y <= y <= upper_y):
+            return 'out-of-bounds'
+
+        angle = math.atan2(math.sin(body.angle), math.cos(body.angle))
+        velocity = body.linearVelocity
+        speed = math.sqrt(velocity.x ** 2 + velocity.y ** 2)
+        if abs(angle) > self.max_flip_angle and speed < self.max_flip_speed:
+            if self.flip_step_index is None:
+                self.flip_step_index = step_index
+            elif step_index - self.flip_step_index >= self.max_flip_step_count:
+                return 'flipped'
+        else:
+            self.flip_step_index = None
+
+        if self.progress is None or x >= self.progress + self.min_progress:
+            self.progress = x
+            self.progress_step_index = step_index
+        elif (step_index - self.progress_step_index >=
+              self.max_stuck_step_count):
+            return 'stuck'
+        return None
@@ -0,0 +1,82 @@
+from __future__ import division
+
+from collections import deque
+import csv
+import json
+import time
+
+class NullPhase(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+null_phase = NullPhase()
+
+class Phase(object):
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = time.time()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add(self.name, time.time() - self.start_time)
+
+class Profiler(object):
+    # Records the time spent in each named phase of a frame, for the last
+    # frame_count frames. Phases outside a frame, or of a disabled profiler,
+    # cost one method call and are not recorded.
+
+    def __init__(self, enabled=True, frame_count=600):
+        self.enabled = enabled
+        self.phase_names = []
+        self.frames = deque(maxlen=frame_count)
+        self.frame = None
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame = {}
+
+    def end_frame(self):
+        if self.frame is not None:
+            self.frames.append(self.frame)
+            self.frame = None
+
+    def phase(self, name):
+        if self.frame is None:
+            return null_phase
+        return Phase(self, name)
+
+    def add(self, name, duration):
+        if name not in self.phase_names:
+            self.phase_names.append(name)
+        self.frame[name] = self.frame.get(name, 0) + duration
+
+    def get_averages(self):
+        averages = []
+        for name in self.phase_names:
+            total = sum(frame.get(name, 0) for frame in self.frames)
+            averages.append((name, total / max(1, len(self.frames))))
+        return averages
+
+    def dump(self, path):
+        # CSV with one row per frame if path ends with .csv, JSON otherwise.
+        # Times are in seconds.
+        with open(path, 'wb') as file_:
+            if path.endswith('.csv'):
+                writer = csv.writer(file_)
+                writer.writerow(self.phase_names)
+                for frame in self.frames:
+                    writer.writerow([frame.get(name, 0)
+                                     for name in self.phase_names])
+            else:
+                json.dump({'phases': self.phase_names,
+                           'frames': [[frame.get(name, 0)
+                                       for name in self.phase_names]
+                                      for frame in self.frames]}, file_)
+
+null_profiler = Profiler(enabled=False)
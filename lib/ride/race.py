@@ -0,0 +1,102 @@
+from __future__ import division
+
+import b2
+
+# How far the sensor regions stay inside the world bounds, since Box2D drops
+# shapes that reach outside them.
+region_margin = 0.01
+
+class RaceContactListener(b2.b2ContactListener):
+    def __init__(self, race_state):
+        super(RaceContactListener, self).__init__()
+        self.race_state = race_state
+
+    def Add(self, point):
+        self.race_state.add_contact(point.shape1, point.shape2)
+
+# Turns the checkpoints and the goal of a level into Box2D sensors, and
+# records the step index at which the racer first reaches each of them. Every
+# region covers the world from its line to the right edge, so that the racer
+# cannot pass one between two steps. The racer is the body that the camera
+# follows, or any dynamic body if there is no camera.
+class RaceState(object):
+    def __init__(self, level_actor, level_model):
+        self.level_actor = level_actor
+        if level_actor.camera_actor is None:
+            self.racer = None
+        else:
+            self.racer = level_actor.camera_actor.body.userData
+        lines = [x for x, y in level_model.checkpoints]
+        lines.append(level_model.goal[0])
+        self.lines = lines
+        self.step_indices = [None] * len(lines)
+
+        body_def = b2.b2BodyDef()
+        self.body = level_actor.world.CreateBody(body_def)
+        lower_x, lower_y = level_model.lower_bound
+        upper_x, upper_y = level_model.upper_bound
+        lower_y += region_margin
+        upper_x -= region_margin
+        upper_y -= region_margin
+        for index, x in enumerate(lines):
+            x = max(x, lower_x + region_margin)
+            if x >= upper_x:
+                continue
+            shape_def = b2.b2PolygonDef()
+            shape_def.SetAsBox((upper_x - x) / 2, (upper_y - lower_y) / 2,
+                               ((x + upper_x) / 2, (lower_y + upper_y) / 2), 0)
+            shape_def.isSensor = True
+            shape = self.body.CreateShape(shape_def)
+            shape.userData = index
+
+        self.contact_listener = RaceContactListener(self)
+        level_actor.world.SetContactListener(self.contact_listener)
+
+    @property
+    def checkpoint_step_indices(self):
+        return self.step_indices[:-1]
+
+    @property
+    def finish_step_index(self):
+        return self.step_indices[-1]
+
+    def add_contact(self, shape_1, shape_2):
+        # Called by Box2D at the start of the world step, when the bodies are
+        # still where the previous steps left them.
+        if shape_1.IsSensor():
+            sensor, other = shape_1, shape_2
+        elif shape_2.IsSensor():
+            sensor, other = shape_2, shape_1
+        else:
+            return
+        index = sensor.userData
+        if self.step_indices[index] is None and self.is_racer(other.GetBody()):
+            self.step_indices[index] = self.level_actor.step_index
+
+    def is_racer(self, body):
+        if self.racer is None:
+            return not body.IsStatic()
+        return body.userData is self.racer
+
+    def get_racer_extent(self):
+        # The rightmost point of the racer, from its shapes rather than the
+        # sensors.
+        extent = None
+        for body in self.level_actor.dynamic_bodies:
+            if not self.is_racer(body):
+                continue
+            for shape in body.shapeList:
+                if isinstance(shape, b2.b2PolygonShape):
+                    x = max(body.GetWorldPoint(v).x for v in shape.vertices)
+                elif isinstance(shape, b2.b2CircleShape):
+                    x = (body.GetWorldPoint(shape.localPosition).x +
+                         shape.radius)
+                else:
+                    continue
+                extent = x if extent is None else max(extent, x)
+        return extent
+
+    def rewind(self, step_index):
+        # Forget the regions reached after the given step.
+        self.step_indices = [i if i is not None and i <= step_index else None
+                             for i in self.step_indices]
@@ -0,0 +1,173 @@
+from __future__ import division
+
+import settings
+from simulation import *
+
+from optparse import OptionParser
+import struct
+import sys
+
+# Replay file layout, little-endian:
+#
+#   header    magic "RIDE", format version (B), time step (d), and
+#             simulation flags (B): 1 for native joints, 2 for implicit
+#             springs and 4 for the adaptive solver
+#   strings   level path, vehicle path, then a count (H) of key names and
+#             the names, each string as a length (H) and UTF-8 bytes
+#   events    count (I), then per event the step index (I) and a code (B)
+#             that is the key name index times two plus one if pressed
+
+replay_magic = 'RIDE'
+replay_version = 2
+
+# A replay only plays back the same run in a simulation with the same time
+# step and flags as the one it was recorded in.
+class Replay(object):
+    def __init__(self, level_path, vehicle_path, dt=settings.dt, events=(),
+                 native_joints=False, implicit_springs=False,
+                 adaptive_solver=False):
+        self.level_path = level_path
+        self.vehicle_path = vehicle_path
+        self.dt = dt
+        self.events = list(events)
+        self.native_joints = native_joints
+        self.implicit_springs = implicit_springs
+        self.adaptive_solver = adaptive_solver
+
+class ReplayRecorder(object):
+    # Passes key presses and releases on to a level actor and records them
+    # against the step they will be applied before.
+
+    def __init__(self, level_actor, replay):
+        self.level_actor = level_actor
+        self.replay = replay
+
+    def press_key(self, name):
+        self.replay.events.append((self.level_actor.step_index, name, True))
+        self.level_actor.press_key(name)
+
+    def release_key(self, name):
+        self.replay.events.append((self.level_actor.step_index, name, False))
+        self.level_actor.release_key(name)
+
+def write_string(file_, string):
+    data = string.encode('utf-8')
+    file_.write(struct.pack('<H', len(data)))
+    file_.write(data)
+
+def read_string(file_):
+    length, = struct.unpack('<H', file_.read(2))
+    return file_.read(length).decode('utf-8')
+
+def save_replay(replay, path):
+    names = sorted(set(name for step_index, name, pressed in replay.events))
+    name_indices = dict((name, i) for i, name in enumerate(names))
+    with open(path, 'wb') as file_:
+        flags = (int(replay.native_joints) |
+                 int(replay.implicit_springs) << 1 |
+                 int(replay.adaptive_solver) << 2)
+        file_.write(struct.pack('<4sBdB', replay_magic, replay_version,
+                                replay.dt, flags))
+        write_string(file_, replay.level_path)
+        write_string(file_, replay.vehicle_path)
+        file_.write(struct.pack('<H', len(names)))
+        for name in names:
+            write_string(file_, name)
+        file_.write(struct.pack('<I', len(replay.events)))
+        for step_index, name, pressed in replay.events:
+            code = name_indices[name] * 2 + int(pressed)
+            file_.write(struct.pack('<IB', step_index, code))
+
+def load_replay(path):
+    with open(path, 'rb') as file_:
+        magic, version, dt, flags = struct.unpack('<4sBdB', file_.read(14))
+        if magic != replay_magic or version != replay_version:
+            raise ValueError('%s: not a version %d replay' %
+                             (path, replay_version))
+        level_path = read_string(file_)
+        vehicle_path = read_string(file_)
+        name_count, = struct.unpack('<H', file_.read(2))
+        names = [read_string(file_) for _ in xrange(name_count)]
+        event_count, = struct.unpack('<I', file_.read(4))
+        data = file_.read(event_count * 5)
+    events = []
+    for i in xrange(event_count):
+        step_index, code = struct.unpack_from('<IB', data, i * 5)
+        events.append((step_index, names[code // 2], bool(code % 2)))
+    return Replay(level_path, vehicle_path, dt, events, bool(flags & 1),
+                  bool(flags & 2), bool(flags & 4))
+
+def load_replay_level_actor(replay):
+    return load_level_actor(replay.level_path, replay.vehicle_path,
+                            replay.native_joints, replay.implicit_springs,
+                            replay.adaptive_solver)
+
+def play_replay(replay, step_count):
+    # Run the replay headless for at most step_count steps, stopping at the
+    # finish. Returns the simulation.
+    level_actor = load_replay_level_actor(replay)
+    simulation = Simulation(level_actor, replay.dt, replay.events)
+    while (simulation.step_index < step_count and
+           simulation.finish_step_index is None):
+        simulation.step()
+    return simulation
+
+def format_step_index(step_index):
+    return '-' if step_index is None else str(step_index)
+
+def check_finish(replay, step_count):
+    # Run the replay headless, and return the first step at which the shapes
+    # of the racer overlap the goal line together with the finish step that
+    # the sensors recorded. The two should be equal.
+    level_actor = load_replay_level_actor(replay)
+    simulation = Simulation(level_actor, replay.dt, replay.events)
+    race_state = level_actor.race_state
+    overlap_step_index = None
+    while simulation.step_index < step_count:
+        if overlap_step_index is None:
+            extent = race_state.get_racer_extent()
+            if extent is not None and extent >= race_state.lines[-1]:
+                overlap_step_index = simulation.step_index
+        if (overlap_step_index is not None and
+            simulation.finish_step_index is not None):
+            break
+        simulation.step()
+    return overlap_step_index, simulation.finish_step_index
+
+def main():
+    parser = OptionParser(usage='%prog [options] replay...')
+    parser.add_option('-s', '--steps', type='int', dest='step_count',
+                      default=int(600 / settings.dt),
+                      help='maximum number of physics steps per replay')
+    parser.add_option('-c', '--check-finish', action='store_true',
+                      dest='check_finish', default=False,
+                      help='compare the finish step with the first step '
+                           'where the racer overlaps the goal line')
+    options, args = parser.parse_args()
+    if not args:
+        parser.error('no replay files given')
+    if options.check_finish:
+        mismatch = False
+        for path in args:
+            overlap_step_index, finish_step_index = \
+                check_finish(load_replay(path), options.step_count)
+            if overlap_step_index == finish_step_index:
+                status = 'ok'
+            else:
+                status = 'mismatch'
+                mismatch = True
+            sys.stdout.write('%s\t%s\t%s\t%s\n' %
+                             (path, format_step_index(overlap_step_index),
+                              format_step_index(finish_step_index), status))
+        sys.exit(1 if mismatch else 0)
+    for path in args:
+        simulation = play_replay(load_replay(path), options.step_count)
+        if simulation.finish_time is None:
+            finish_time = '-'
+        else:
+            finish_time = '%.3f' % simulation.finish_time
+        sys.stdout.write('%s\t%s\t%d\n' % (path, finish_time,
+                                           simulation.step_index))
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,25 @@
 from __future__ import division
 
+import os
+
 fullscreen = True
 fps = True
 debug = False
+replay_path = None
+profile = False
+profile_path = None
 
 camera_height = 20
 dt = 1 / 60
+max_step_count = 5
+native_joints = False
+implicit_springs = False
+adaptive_solver = False
+
+# Time budget of a physics step for the adaptive solver, in seconds. Only
+# the game uses it, and not while recording a replay, since it makes runs
+# depend on the speed of the machine.
+solver_time_budget = dt / 2
+
+cache = True
+cache_dir = os.path.join(os.path.expanduser('~'), '.ride', 'cache')
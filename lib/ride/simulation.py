@@ -0,0 +1,106 @@
+from __future__ import division
+
+from actors import *
+import cache
+import settings
+import svg
+
+from bisect import bisect_left
+
+def load_level_actor(level_path, vehicle_path, native_joints=None,
+                     implicit_springs=None, adaptive_solver=None):
+    if native_joints is None:
+        native_joints = settings.native_joints
+    if implicit_springs is None:
+        implicit_springs = settings.implicit_springs
+    if adaptive_solver is None:
+        adaptive_solver = settings.adaptive_solver
+    loader = cache if settings.cache else svg
+    level_model = loader.load_level(level_path)
+    loader.load_vehicle(vehicle_path, level_model)
+    return LevelActor(level_model, native_joints, implicit_springs,
+                      adaptive_solver)
+
+# Steps a level actor without a window, as fast as the CPU allows. Input
+# events are (step index, key name, pressed) tuples, applied just before
+# the step with that index. Keep this module free of pyglet imports.
+class Simulation(object):
+    def __init__(self, level_actor, dt=settings.dt, input_events=()):
+        self.level_actor = level_actor
+        self.dt = dt
+        self.input_events = sorted(input_events,
+                                   key=lambda event: event[0])
+        self.input_event_index = 0
+
+    @property
+    def step_index(self):
+        return self.level_actor.step_index
+
+    @property
+    def finish_step_index(self):
+        return self.level_actor.race_state.finish_step_index
+
+    @property
+    def time(self):
+        return self.step_index * self.dt
+
+    @property
+    def finish_time(self):
+        if self.finish_step_index is None:
+            return None
+        return self.finish_step_index * self.dt
+
+    def step(self):
+        level_actor = self.level_actor
+        while (self.input_event_index < len(self.input_events) and
+               self.input_events[self.input_event_index][0] <=
+               level_actor.step_index):
+            step_index, name, pressed = \
+                self.input_events[self.input_event_index]
+            if pressed:
+                level_actor.press_key(name)
+            else:
+                level_actor.release_key(name)
+            self.input_event_index += 1
+        level_actor.profiler.begin_frame()
+        level_actor.step(self.dt)
+        level_actor.profiler.end_frame()
+
+    def run(self, step_count):
+        for _ in xrange(step_count):
+            self.step()
+
+    def save_snapshot(self):
+        return self.level_actor.save_snapshot()
+
+    def restore_snapshot(self, snapshot):
+        # Rewind to a snapshot taken earlier in this simulation. Input events
+        # from the restored step on are applied again.
+        self.level_actor.restore_snapshot(snapshot)
+        step_index = self.level_actor.step_index
+        self.input_event_index = bisect_left(self.input_events,
+                                             (step_index,))
+
+# Turns frame times into a number of fixed physics steps. Catch-up work is
+# capped at max_step_count steps per frame; time beyond that is dropped
+# rather than piling up after a slow frame. alpha is how far the frame time
+# is between the last two physics states, for interpolated drawing.
+class SimulationClock(object):
+    def __init__(self, dt=settings.dt, max_step_count=settings.max_step_count):
+        self.dt = dt
+        self.max_step_count = max_step_count
+        self.time = 0
+        self.world_time = 0
+
+    @property
+    def alpha(self):
+        return (self.time - self.world_time) / self.dt
+
+    def advance(self, dt):
+        self.time += dt
+        step_count = int((self.time - self.world_time) / self.dt)
+        if step_count > self.max_step_count:
+            step_count = self.max_step_count
+            self.time = self.world_time + step_count * self.dt
+        self.world_time += step_count * self.dt
+        return step_count
@@ -0,0 +1,131 @@
+from __future__ import division
+
+import math
+import time
+
+# Chooses the solver iterations and substeps of every level step. The
+# iterations follow the number of contacts and joints, go up while revolute
+# joints drift apart and down while steps overrun their time budget, always
+# within the floor and ceiling of the level. A spike in kinetic energy is
+# taken as the start of an instability, and is answered with the ceiling and
+# substeps for a while.
+#
+# Energies are in joules, that is kg m^2 / s^2. A spike is a jump to more than
+# energy_spike times the previous energy, and to more than the energy it takes
+# to lift all dynamic bodies by spike_height meters against gravity, so that
+# bodies starting to move from rest do not count.
+#
+# Without a time budget, the choices only depend on the simulation state, so
+# headless runs stay deterministic.
+class SolverController(object):
+    def __init__(self, min_iterations=4, max_iterations=20, time_budget=None,
+                 check_interval=4, contacts_per_iteration=8, max_error=0.01,
+                 energy_spike=4, spike_height=0.1, max_substep_count=4,
+                 recovery_step_count=60):
+        self.min_iterations = min_iterations
+        self.max_iterations = max_iterations
+        self.time_budget = time_budget
+        self.check_interval = check_interval
+        self.contacts_per_iteration = contacts_per_iteration
+        self.max_error = max_error
+        self.energy_spike = energy_spike
+        self.spike_height = spike_height
+        self.max_substep_count = max_substep_count
+        self.recovery_step_count = recovery_step_count
+        self.reset()
+
+    def reset(self):
+        self.velocity_iterations = self.min_iterations
+        self.position_iterations = self.min_iterations
+        self.substep_count = 1
+        self.base_iterations = self.min_iterations
+        self.error_iterations = 0
+        self.budget_iterations = 0
+        self.energy = None
+        self.min_spike_energy = None
+        self.recovery_step_count_left = 0
+        self.over_budget = False
+
+    def step(self, level_actor, dt):
+        if level_actor.step_index % self.check_interval == 0:
+            self.update(level_actor)
+        if self.time_budget is not None:
+            start_time = time.time()
+        for _ in xrange(self.substep_count):
+            level_actor.step_world(dt / self.substep_count,
+                                   self.velocity_iterations,
+                                   self.position_iterations)
+        if self.time_budget is not None:
+            self.over_budget = time.time() - start_time > self.time_budget
+        if self.recovery_step_count_left:
+            self.recovery_step_count_left -= 1
+            if not self.recovery_step_count_left:
+                self.substep_count = 1
+
+    def update(self, level_actor):
+        world = level_actor.world
+        self.base_iterations = (self.min_iterations +
+                                (world.GetContactCount() +
+                                 world.GetJointCount()) //
+                                self.contacts_per_iteration)
+
+        error = self.get_constraint_error(level_actor)
+        if error > self.max_error:
+            self.error_iterations += 2
+        elif error < self.max_error / 4 and self.error_iterations:
+            self.error_iterations -= 1
+
+        if self.over_budget:
+            self.budget_iterations += 1
+        elif self.budget_iterations:
+            self.budget_iterations -= 1
+
+        if self.min_spike_energy is None:
+            self.min_spike_energy = (self.spike_height *
+                                     self.get_weight(level_actor))
+        energy = self.get_kinetic_energy(level_actor)
+        if (self.energy is not None and
+            energy > self.energy_spike * self.energy and
+            energy > self.min_spike_energy):
+            self.substep_count = min(self.substep_count * 2,
+                                     self.max_substep_count)
+            self.recovery_step_count_left = self.recovery_step_count
+        self.energy = energy
+
+        if self.recovery_step_count_left:
+            self.velocity_iterations = self.max_iterations
+            self.position_iterations = self.max_iterations
+        else:
+            iterations = self.base_iterations - self.budget_iterations
+            self.velocity_iterations = self.clamp(iterations)
+            self.position_iterations = self.clamp(iterations +
+                                                  self.error_iterations)
+
+    def clamp(self, iterations):
+        return max(self.min_iterations, min(iterations, self.max_iterations))
+
+    @staticmethod
+    def get_constraint_error(level_actor):
+        # The largest distance between the anchors of a revolute joint.
+        error = 0
+        for joint_model, joint in level_actor.revolute_joints:
+            error = max(error, (joint.GetAnchor1() -
+                                joint.GetAnchor2()).Length())
+        return error
+
+    @staticmethod
+    def get_weight(level_actor):
+        # The total weight of the dynamic bodies, in newtons.
+        gravity_x, gravity_y = level_actor.gravity
+        gravity = math.sqrt(gravity_x ** 2 + gravity_y ** 2)
+        return gravity * sum(body.GetMass()
+                             for body in level_actor.dynamic_bodies)
+
+    @staticmethod
+    def get_kinetic_energy(level_actor):
+        energy = 0
+        for body in level_actor.dynamic_bodies:
+            velocity = body.linearVelocity
+            energy += (body.GetMass() * (velocity.x ** 2 + velocity.y ** 2) +
+                       body.GetInertia() * body.angularVelocity ** 2) / 2
+        return energy
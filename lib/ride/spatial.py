@@ -0,0 +1,125 @@
+from __future__ import division
+
+from models import *
+
+from collections import defaultdict
+import math
+
+def get_shape_bounds(shape_model):
+    if isinstance(shape_model, CircleModel):
+        x, y = shape_model.center
+        r = shape_model.radius
+        return x - r, y - r, x + r, y + r
+    elif isinstance(shape_model, PolygonModel):
+        xs = shape_model.vertex_array[0::2]
+        ys = shape_model.vertex_array[1::2]
+        return min(xs), min(ys), max(xs), max(ys)
+    else:
+        assert False
+
+def contains_point(shape_model, point):
+    x, y = point
+    if isinstance(shape_model, CircleModel):
+        cx, cy = shape_model.center
+        return (x - cx) ** 2 + (y - cy) ** 2 <= shape_model.radius ** 2
+    elif isinstance(shape_model, PolygonModel):
+        # Convex polygon with either winding: the point must not be on
+        # opposite sides of any two edges.
+        vertices = shape_model.vertices
+        side = 0
+        for i in xrange(len(vertices)):
+            x1, y1 = vertices[i - 1]
+            x2, y2 = vertices[i]
+            cross = (x2 - x1) * (y - y1) - (y2 - y1) * (x - x1)
+            if cross < 0:
+                if side > 0:
+                    return False
+                side = -1
+            elif cross > 0:
+                if side < 0:
+                    return False
+                side = 1
+        return True
+    else:
+        assert False
+
+class ShapeIndex(object):
+    # Uniform grid over the shape bounds of a level model. Bodies are ranked
+    # by their position in level_model.body_models, which is also the drawing
+    # order of the body actors.
+
+    def __init__(self, body_models, cell_size=None):
+        entries = []
+        for z, body_model in enumerate(body_models):
+            for shape_model in body_model.shape_models:
+                bounds = get_shape_bounds(shape_model)
+                entries.append((bounds, z, body_model, shape_model))
+        if cell_size is None:
+            cell_size = 1
+            if entries:
+                sizes = [max(b[2] - b[0], b[3] - b[1]) for b, _, _, _ in entries]
+                cell_size = max(cell_size, sum(sizes) / len(sizes))
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        for entry in entries:
+            min_x, min_y, max_x, max_y = entry[0]
+            for i in xrange(self.get_cell(min_x), self.get_cell(max_x) + 1):
+                for j in xrange(self.get_cell(min_y), self.get_cell(max_y) + 1):
+                    self.cells[i, j].append(entry)
+
+    def get_cell(self, x):
+        return int(math.floor(x / self.cell_size))
+
+    def get_body_models_at_point(self, point):
+        x, y = point
+        cell = self.cells.get((self.get_cell(x), self.get_cell(y)), ())
+        ranked = {}
+        for (min_x, min_y, max_x, max_y), z, body_model, shape_model in cell:
+            if (z not in ranked and min_x <= x <= max_x and
+                min_y <= y <= max_y and contains_point(shape_model, point)):
+                ranked[z] = body_model
+        return [ranked[z] for z in sorted(ranked)]
+
+    def get_top_body_models_at_point(self, point, body_count=2):
+        return self.get_body_models_at_point(point)[-body_count:]
+
+    def get_top_body_model_at_point(self, point):
+        body_models = self.get_body_models_at_point(point)
+        if not body_models:
+            raise ValueError('no body at point (%g, %g)' % tuple(point))
+        return body_models[-1]
+
+def is_joint_bound(joint_model):
+    if isinstance(joint_model, (MotorModel, CameraModel)):
+        return joint_model.body_model is not None
+    else:
+        return joint_model.body_model_1 is not None
+
+def bind_joints(level_model):
+    # Resolve the bodies of every unbound joint model from its anchors. A
+    # revolute joint over a single body is bound to the ground, which is
+    # represented by body_model_2 being None.
+    joint_models = [j for j in level_model.joint_models
+                    if not is_joint_bound(j)]
+    if not joint_models:
+        return
+    index = ShapeIndex(level_model.body_models)
+    for joint_model in joint_models:
+        if isinstance(joint_model, RevoluteJointModel):
+            anchor = joint_model.anchor
+            body_models = index.get_top_body_models_at_point(anchor)
+            if not body_models:
+                raise ValueError('no body at point (%g, %g)' % tuple(anchor))
+            joint_model.body_model_1 = body_models[0]
+            if len(body_models) == 2:
+                joint_model.body_model_2 = body_models[1]
+        elif isinstance(joint_model, (DistanceJointModel, PrismaticJointModel,
+                                      SpringModel)):
+            get_body_model = index.get_top_body_model_at_point
+            joint_model.body_model_1 = get_body_model(joint_model.anchor_1)
+            joint_model.body_model_2 = get_body_model(joint_model.anchor_2)
+        elif isinstance(joint_model, (MotorModel, CameraModel)):
+            get_body_model = index.get_top_body_model_at_point
+            joint_model.body_model = get_body_model(joint_model.anchor)
+        else:
+            assert False
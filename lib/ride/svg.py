@@ -3,31 +3,134 @@ from __future__ import division
 from models import *
 from utils import *
 
+from array import array
 from euclid import *
 from itertools import *
-from xml.dom import minidom
+import math
+from xml import sax
+
+class Element(object):
+    # The parts of a DOM element that the parse functions use, collected
+    # while streaming.
+    def __init__(self, name, attributes, transform):
+        self.nodeName = name
+        self.attributes = dict(attributes.items())
+        self.transform = transform
+        self.description = None
+
+    def getAttribute(self, name):
+        return self.attributes.get(name, '')
+
+class SvgHandler(sax.ContentHandler):
+    # Streams an Inkscape SVG document into a level model. Only the open
+    # groups and the current shape element are kept in memory. Transforms
+    # are tracked relative to the document, and the document transform is
+    # applied when each shape element is parsed. It depends on the
+    # description in the metadata, so shape elements seen before the
+    # description are held back until it arrives.
+
+    def __init__(self, level_model, create_transform):
+        sax.ContentHandler.__init__(self)
+        self.level_model = level_model
+        self.create_transform = create_transform
+        self.width = None
+        self.height = None
+        self.transform = None
+        self.transform_stack = []
+        self.element = None
+        self.skip_depth = 0
+        self.text = None
+        self.pending = []
+
+    def startElement(self, name, attributes):
+        if self.skip_depth:
+            self.skip_depth += 1
+            if name == 'dc:description':
+                self.text = []
+        elif self.element is not None:
+            if name == 'desc':
+                self.text = []
+            self.skip_depth = 1
+        elif name == 'svg' and self.width is None:
+            self.width = float(attributes.get('width'))
+            self.height = float(attributes.get('height'))
+            self.transform_stack.append(Matrix3.new_identity())
+        else:
+            transform = self.transform_stack[-1]
+            transform_str = attributes.get('transform')
+            if transform_str:
+                transform = transform * parse_transform(transform_str)
+            if name == 'g':
+                self.transform_stack.append(transform)
+            elif name in ('path', 'rect'):
+                self.element = Element(name, attributes, transform)
+            else:
+                if name not in ('sodipodi:namedview', 'defs', 'metadata'):
+                    log('parse_element(): unsupported SVG element: %s' % name)
+                self.skip_depth = 1
+
+    def characters(self, content):
+        if self.text is not None:
+            self.text.append(content)
+
+    def endElement(self, name):
+        if self.skip_depth:
+            self.skip_depth -= 1
+            if self.text is not None and name in ('desc', 'dc:description'):
+                text = ''.join(self.text)
+                self.text = None
+                if name == 'desc':
+                    self.element.description = text
+                else:
+                    self.set_description(text)
+        elif self.element is not None:
+            if self.transform is None:
+                self.pending.append(self.element)
+            else:
+                self.parse_element(self.element)
+            self.element = None
+        else:
+            self.transform_stack.pop()
+
+    def endDocument(self):
+        assert self.transform is not None, 'missing dc:description'
+
+    def set_description(self, description):
+        if self.transform is None:
+            self.transform = self.create_transform(self.width, self.height,
+                                                   parse_style(description))
+            for element in self.pending:
+                self.parse_element(element)
+            del self.pending[:]
+
+    def parse_element(self, element):
+        parse_element(element, self.transform * element.transform,
+                      self.level_model)
+
+def parse_svg(path, level_model, create_transform):
+    parser = sax.make_parser()
+    parser.setFeature(sax.handler.feature_namespaces, False)
+    parser.setFeature(sax.handler.feature_external_ges, False)
+    parser.setContentHandler(SvgHandler(level_model, create_transform))
+    parser.parse(path)
 
 def load_level(path):
-    document = minidom.parse(path)
-    svg_element = document.getElementsByTagName('svg')[0]
-    width = float(svg_element.getAttribute('width'))
-    height = float(svg_element.getAttribute('height'))
-    description_element = document.getElementsByTagName('dc:description')[0]
-    description = description_element.childNodes[0].nodeValue
-    description_data = parse_style(description)
-    world_width = float(description_data['width'])
-    gravity = float(description_data.get('gravity', '10'))
-    scale = world_width / width
-    world_height = height * scale
     level_model = LevelModel()
-    level_model.lower_bound = 0, 0
-    level_model.upper_bound = world_width, world_height
-    level_model.gravity = 0, -gravity
-    transform = (Matrix3.new_scale(scale, -scale) *
-                 Matrix3.new_translate(0, -height))
-    for child_node in svg_element.childNodes:
-        if child_node.nodeType == minidom.Node.ELEMENT_NODE:
-            parse_element(child_node, transform, level_model)
+    def create_transform(width, height, description_data):
+        world_width = float(description_data['width'])
+        gravity = float(description_data.get('gravity', '10'))
+        scale = world_width / width
+        world_height = height * scale
+        level_model.lower_bound = 0, 0
+        level_model.upper_bound = world_width, world_height
+        level_model.gravity = 0, -gravity
+        level_model.min_iterations = int(description_data.get('min-iterations',
+                                                              '4'))
+        level_model.max_iterations = int(description_data.get('max-iterations',
+                                                              '20'))
+        return (Matrix3.new_scale(scale, -scale) *
+                Matrix3.new_translate(0, -height))
+    parse_svg(path, level_model, create_transform)
     return level_model
 
 def get_bodies_at_point(world, point):
@@ -47,21 +150,13 @@ def get_bodies_at_line_segment(world, line_segment):
     return bodies_1[0], bodies_2[0]
 
 def load_vehicle(path, level_model):
-    document = minidom.parse(path)
-    svg_element = document.getElementsByTagName('svg')[0]
-    width = float(svg_element.getAttribute('width'))
-    height = float(svg_element.getAttribute('height'))
-    description_element = document.getElementsByTagName('dc:description')[0]
-    description = description_element.childNodes[0].nodeValue
-    world_width = float(parse_style(description)['width'])
-    scale = world_width / width
-    world_height = height * scale
-    transform = (Matrix3.new_translate(*level_model.start) *
-                 Matrix3.new_scale(scale, -scale) *
-                 Matrix3.new_translate(0, -height))
-    for child_node in svg_element.childNodes:
-        if child_node.nodeType == minidom.Node.ELEMENT_NODE:
-            parse_element(child_node, transform, level_model)
+    def create_transform(width, height, description_data):
+        world_width = float(description_data['width'])
+        scale = world_width / width
+        return (Matrix3.new_translate(*level_model.start) *
+                Matrix3.new_scale(scale, -scale) *
+                Matrix3.new_translate(0, -height))
+    parse_svg(path, level_model, create_transform)
 
 def parse_style(style):
     lines = (l.strip() for l in style.split(';'))
@@ -87,17 +182,10 @@ def parse_transform(transform_str):
         return Matrix3.new_identity()
 
 def parse_element(element, transform, level_model):
-    transform_str = element.getAttribute('transform')
-    if transform_str:
-        transform = transform * parse_transform(transform_str)
     element_data = parse_element_data(element)
     if element_data.get('type') == 'revolute-joint':
         parse_revolute_joint_element(element, transform, level_model,
                                      element_data)
-    elif element.nodeName == 'g':
-        for child_node in element.childNodes:
-            if child_node.nodeType == minidom.Node.ELEMENT_NODE:
-                parse_element(child_node, transform, level_model)
     elif element.nodeName == 'path':
         if element.getAttribute('sodipodi:type') == 'arc':
             body_model = BodyModel()
@@ -111,14 +199,10 @@ def parse_element(element, transform, level_model):
         body_model.id = element.getAttribute('id')
         level_model.body_models.append(body_model)
         parse_rect_element(element, transform, level_model, body_model)
-    elif element.nodeName not in ('sodipodi:namedview', 'defs', 'metadata'):
-        log('parse_element(): unsupported SVG element: %s' % element.nodeName)
 
 def parse_element_data(element):
-    for child_node in element.childNodes:
-        if (child_node.nodeType == minidom.Node.ELEMENT_NODE and
-            child_node.nodeName == 'desc'):
-            return parse_style(child_node.childNodes[0].nodeValue)
+    if element.description:
+        return parse_style(element.description)
     return {}
 
 def parse_line_segment_element(element, transform):
@@ -129,11 +213,55 @@ def parse_line_segment_element(element, transform):
     return transform * LineSegment2(*points)
 
 def parse_polygon(path):
+    # Returns the vertices as a flat coordinate array, x0, y0, x1, y1...
     path = path.strip().lstrip('M')
     closed = path.endswith('z')
-    vertices = [Point2(*map(float, p.replace(',', ' ').split()))
-                for p in path.rstrip('z').split('L')]
-    return vertices, closed
+    path = path.rstrip('z').replace(',', ' ').replace('L', ' ')
+    return array('d', map(float, path.split())), closed
+
+def transform_points(transform, coords):
+    # Apply the affine part of a Matrix3 to a flat coordinate array in one
+    # pass, without allocating a Point2 per vertex.
+    a, b, c = transform.a, transform.b, transform.c
+    e, f, g = transform.e, transform.f, transform.g
+    xs = coords[0::2]
+    ys = coords[1::2]
+    result = array('d', coords)
+    result[0::2] = array('d', [a * x + b * y + c for x, y in izip(xs, ys)])
+    result[1::2] = array('d', [e * x + f * y + g for x, y in izip(xs, ys)])
+    return result
+
+def get_distance(p1, p2):
+    return math.hypot(p2[0] - p1[0], p2[1] - p1[1])
+
+def is_on_line_segment(point, p1, p2, tolerance):
+    x, y = point
+    x1, y1 = p1
+    vx, vy = p2[0] - x1, p2[1] - y1
+    length_squared = vx * vx + vy * vy
+    if length_squared:
+        t = max(0, min(1, ((x - x1) * vx + (y - y1) * vy) / length_squared))
+    else:
+        t = 0
+    return math.hypot(x - x1 - vx * t, y - y1 - vy * t) <= tolerance
+
+def simplify_polyline(vertices, tolerance):
+    # Drop repeated vertices, and merge runs of segments that stay within
+    # tolerance of a single segment.
+    result = []
+    merged = []
+    for vertex in vertices:
+        if result and get_distance(vertex, result[-1]) <= tolerance:
+            continue
+        if len(result) >= 2:
+            points = merged + [result[-1]]
+            if all(is_on_line_segment(p, result[-2], vertex, tolerance)
+                   for p in points):
+                merged.append(result.pop())
+            else:
+                merged = []
+        result.append(vertex)
+    return result
 
 def parse_revolute_joint_element(element, transform, level_model,
                                  element_data):
@@ -176,6 +304,10 @@ def parse_path_element(element, transform, level_model):
         x = float(element.getAttribute('sodipodi:cx'))
         y = float(element.getAttribute('sodipodi:cy'))
         level_model.goal = transform * Point2(x, y)
+    elif element_data.get('type') == 'checkpoint':
+        x = float(element.getAttribute('sodipodi:cx'))
+        y = float(element.getAttribute('sodipodi:cy'))
+        level_model.checkpoints.append(transform * Point2(x, y))
     elif element_data.get('type') == 'distance-joint':
         parse_distance_joint_element(element, transform, level_model)
     elif element_data.get('type') == 'prismatic-joint':
@@ -200,8 +332,9 @@ def parse_path_element(element, transform, level_model):
         level_model.joint_models.append(camera_model)
     else:
         style = parse_style(element.getAttribute('style'))
-        vertices, closed = parse_polygon(element.getAttribute('d'))
-        vertices = [transform * v for v in vertices]
+        coords, closed = parse_polygon(element.getAttribute('d'))
+        coords = transform_points(transform, coords)
+        vertices = zip(coords[0::2], coords[1::2])
         body_model = BodyModel()
         body_model.id = element.getAttribute('id')
         stroke_width = float(style.get('stroke-width', '1'))
@@ -211,18 +344,43 @@ def parse_path_element(element, transform, level_model):
                       restitution=float(element_data.get('restitution', '0.5')),
                       group_index=int(element_data.get('group-index', '0')),
                       color=parse_color(style.get('stroke', '#000000')))
-        for p1, p2 in izip(vertices[:-1], vertices[1:]):
-            polygon_model = PolygonModel(**kwargs)
-            v = (p2 - p1).cross()
-            v.normalize()
-            v *= radius
-            polygon_model.vertices = [p1 + v, p2 + v, p2 - v, p1 - v]
-            body_model.shape_models.append(polygon_model)
-            for center in p1, p2:
-                circle_model = CircleModel(center=center, radius=radius, **kwargs)
-                body_model.shape_models.append(circle_model)
+        body_model.shape_models.extend(create_stroke_shape_models(vertices,
+                                                                  radius,
+                                                                  **kwargs))
         level_model.body_models.append(body_model)
 
+def create_stroke_shape_models(vertices, radius, **kwargs):
+    # A polyline stroked with round caps: one quad per segment and one
+    # circle per vertex. The vertices are (x, y) pairs.
+    shape_models = []
+    tolerance = radius / 100
+    vertices = simplify_polyline(vertices, tolerance)
+    for i, (p1, p2) in enumerate(izip(vertices[:-1], vertices[1:])):
+        (x1, y1), (x2, y2) = p1, p2
+        length = math.hypot(x2 - x1, y2 - y1)
+        if length:
+            vx = (y2 - y1) * radius / length
+            vy = (x1 - x2) * radius / length
+        else:
+            vx = vy = 0
+        polygon_model = PolygonModel(**kwargs)
+        polygon_model.vertex_array = array('d', (x1 + vx, y1 + vy,
+                                                 x2 + vx, y2 + vy,
+                                                 x2 - vx, y2 - vy,
+                                                 x1 - vx, y1 - vy))
+        shape_models.append(polygon_model)
+
+        # Neighbouring segments share their cap circles.
+        centers = [p2]
+        if i == 0:
+            centers.insert(0, p1)
+        elif get_distance(p2, vertices[0]) <= tolerance:
+            del centers[:]
+        for center in centers:
+            circle_model = CircleModel(center=center, radius=radius, **kwargs)
+            shape_models.append(circle_model)
+    return shape_models
+
 def parse_color(color_str):
     if color_str == 'none':
         return 0, 0, 0, 0
@@ -262,13 +420,11 @@ def parse_rect_element(element, transform, level_model, body_model):
     y = float(element.getAttribute('y'))
     width = float(element.getAttribute('width'))
     height = float(element.getAttribute('height'))
-    vertices = [Point2(x, y),
-                Point2(x, y + height),
-                Point2(x + width, y + height),
-                Point2(x + width, y)]
+    coords = array('d', (x, y, x, y + height,
+                         x + width, y + height, x + width, y))
 
     polygon_model = PolygonModel()
-    polygon_model.vertices = [tuple(transform * v) for v in vertices]
+    polygon_model.vertex_array = transform_points(transform, coords)
     polygon_model.density = float(element_data.get('density', '0'))
     polygon_model.friction = float(element_data.get('friction', '0.5'))
     polygon_model.restitution = float(element_data.get('restitution', '0.5'))
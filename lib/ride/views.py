@@ -0,0 +1,255 @@
+from __future__ import division
+
+from actors import *
+import b2
+from graphics import *
+from profiler import *
+
+import math
+import pyglet
+from pyglet.gl import *
+
+class BodyGroup(pyglet.graphics.OrderedGroup):
+    def __init__(self, body, parent=None):
+        super(BodyGroup, self).__init__(body.userData.z, parent)
+        self.body = body
+        self.previous_transform = None
+        self.transform = 0, 0, 0
+
+    def save_transform(self):
+        x, y = self.body.position.tuple()
+        self.previous_transform = x, y, self.body.angle
+
+    def update_transform(self, alpha=1):
+        # Interpolate between the saved transform and the current one.
+        x, y = self.body.position.tuple()
+        angle = self.body.angle
+        if self.previous_transform is not None:
+            previous_x, previous_y, previous_angle = self.previous_transform
+            x = previous_x + alpha * (x - previous_x)
+            y = previous_y + alpha * (y - previous_y)
+            angle = previous_angle + alpha * (angle - previous_angle)
+        self.transform = x, y, angle
+
+    def set_state(self):
+        glPushMatrix()
+        x, y, angle = self.transform
+        glTranslatef(x, y, 0)
+        glRotatef(angle * 180 / math.pi, 0, 0, 1)
+
+    def unset_state(self):
+        glPopMatrix()
+
+def get_shape_points(shape):
+    if isinstance(shape, b2.b2PolygonShape):
+        return list(shape.vertices)
+    else:
+        return [shape.localPosition.tuple()]
+
+def get_bounds(points):
+    xs = [x for x, y in points]
+    ys = [y for x, y in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def intersects(bounds_1, bounds_2):
+    min_x_1, min_y_1, max_x_1, max_y_1 = bounds_1
+    min_x_2, min_y_2, max_x_2, max_y_2 = bounds_2
+    return (min_x_1 <= max_x_2 and min_x_2 <= max_x_1 and
+            min_y_1 <= max_y_2 and min_y_2 <= max_y_1)
+
+class LevelView(object):
+    def __init__(self, level_actor, scale=None, tile_size=10):
+        self.level_actor = level_actor
+        self.scale = scale
+        self.circle_display_lists = {}
+        self.previous_camera = None
+        self.profiler = null_profiler
+        self.batch = pyglet.graphics.Batch()
+        self.vertex_lists = []
+
+        # Static bodies never move, so their shapes are baked in world
+        # coordinates into one vertex list per tile, drawn below all dynamic
+        # bodies. Tiles are culled by their bounds.
+        tile_shapes = {}
+        for body in level_actor.static_bodies:
+            for shape in body.shapeList:
+                point = body.GetWorldPoint(get_shape_points(shape)[0])
+                key = (int(math.floor(point.x / tile_size)),
+                       int(math.floor(point.y / tile_size)))
+                tile_shapes.setdefault(key, []).append((body, shape))
+        self.static_tiles = []
+        self.static_group = pyglet.graphics.OrderedGroup(0)
+        for key in sorted(tile_shapes):
+            tile = self.add_shapes(tile_shapes[key], self.static_group,
+                                   world=True)
+            if tile is not None:
+                self.static_tiles.append(tile)
+
+        # Dynamic bodies are culled by a bounding circle around the center
+        # of their bounds in body coordinates.
+        self.dynamic_bodies = []
+        for body in level_actor.dynamic_bodies:
+            group = BodyGroup(body)
+            tile = self.add_shapes([(body, shape) for shape in body.shapeList],
+                                   group)
+            if tile is not None:
+                (min_x, min_y, max_x, max_y), vertex_list = tile
+                center = (min_x + max_x) / 2, (min_y + max_y) / 2
+                radius = math.sqrt((max_x - min_x) ** 2 +
+                                   (max_y - min_y) ** 2) / 2
+                self.dynamic_bodies.append((body, group, center, radius,
+                                            vertex_list))
+        self.dynamic_bodies.sort(key=lambda item: item[1].order)
+
+    def delete(self):
+        for vertex_list in self.vertex_lists:
+            vertex_list.delete()
+        del self.vertex_lists[:]
+        for display_list in self.circle_display_lists.itervalues():
+            display_list.delete()
+        self.circle_display_lists.clear()
+
+    def get_circle_vertex_count(self, radius):
+        # Circles are tessellated for their size on screen, given the scale
+        # in pixels per world unit.
+        if self.scale is None:
+            return circle_vertex_counts[-1]
+        return get_circle_vertex_count(radius * self.scale)
+
+    def get_circle_display_list(self, radius):
+        vertex_count = self.get_circle_vertex_count(radius)
+        display_list = self.circle_display_lists.get(vertex_count)
+        if display_list is None:
+            display_list = CircleDisplayList(vertex_count)
+            self.circle_display_lists[vertex_count] = display_list
+        return display_list
+
+    def add_shapes(self, shapes, group, world=False):
+        # Triangulate the shapes and upload the result once. Vertices are in
+        # body coordinates unless world is set. Returns the bounds and the
+        # vertex list, or None if there was nothing to draw.
+        vertices = []
+        colors = []
+        indices = []
+        for body, shape in shapes:
+            color = shape.userData
+            if color is None:
+                color = self.level_actor.color
+            if isinstance(shape, b2.b2PolygonShape):
+                shape_vertices = list(shape.vertices)
+                if world:
+                    shape_vertices = [body.GetWorldPoint(v).tuple()
+                                      for v in shape_vertices]
+            elif isinstance(shape, b2.b2CircleShape):
+                center = shape.localPosition
+                if world:
+                    center = body.GetWorldPoint(center)
+                vertex_count = self.get_circle_vertex_count(shape.radius)
+                shape_vertices = get_circle_vertices(center.tuple(),
+                                                     shape.radius,
+                                                     vertex_count)
+            else:
+                continue
+            offset = len(vertices) // 2
+            for i in xrange(1, len(shape_vertices) - 1):
+                indices.extend((offset, offset + i, offset + i + 1))
+            for x, y in shape_vertices:
+                vertices.extend((x, y))
+            colors.extend(tuple(color) * len(shape_vertices))
+        if not indices:
+            return None
+        count = len(vertices) // 2
+        vertex_list = self.batch.add_indexed(count, GL_TRIANGLES, group,
+                                             indices,
+                                             ('v2f/static', vertices),
+                                             ('c4f/static', colors))
+        self.vertex_lists.append(vertex_list)
+        bounds = get_bounds(zip(vertices[0::2], vertices[1::2]))
+        return bounds, vertex_list
+
+    def save_transforms(self):
+        # Remember the current state as the one to interpolate from. Call this
+        # before the last physics step of a frame.
+        for body, group, center, radius, vertex_list in self.dynamic_bodies:
+            group.save_transform()
+        self.previous_camera = self.level_actor.camera
+
+    def get_camera(self, alpha=1):
+        x, y = self.level_actor.camera
+        if self.previous_camera is not None:
+            previous_x, previous_y = self.previous_camera
+            x = previous_x + alpha * (x - previous_x)
+            y = previous_y + alpha * (y - previous_y)
+        return x, y
+
+    def draw(self, bounds=None, alpha=1):
+        # Only draw geometry that intersects bounds, given as (min_x, min_y,
+        # max_x, max_y) in world coordinates. Dynamic bodies are drawn alpha
+        # of the way from their saved transforms to their current ones.
+        with self.profiler.phase('culling'):
+            vertex_lists, groups = self.cull(bounds, alpha)
+        with self.profiler.phase('draw'):
+            if bounds is None:
+                self.batch.draw()
+                return
+            self.static_group.set_state()
+            for vertex_list in vertex_lists:
+                vertex_list.draw(GL_TRIANGLES)
+            self.static_group.unset_state()
+            for group, vertex_list in groups:
+                group.set_state()
+                vertex_list.draw(GL_TRIANGLES)
+                group.unset_state()
+
+    def cull(self, bounds=None, alpha=1):
+        # Update the transforms of the dynamic bodies and return the static
+        # vertex lists and the body groups that intersect bounds, in z order.
+        vertex_lists = [vertex_list
+                        for tile_bounds, vertex_list in self.static_tiles
+                        if bounds is None or intersects(tile_bounds, bounds)]
+        groups = []
+        for body, group, center, radius, vertex_list in self.dynamic_bodies:
+            group.update_transform(alpha)
+            if bounds is not None:
+                x, y, angle = group.transform
+                center_x, center_y = center
+                cos_angle = math.cos(angle)
+                sin_angle = math.sin(angle)
+                x += cos_angle * center_x - sin_angle * center_y
+                y += sin_angle * center_x + cos_angle * center_y
+                if not intersects((x - radius, y - radius,
+                                   x + radius, y + radius), bounds):
+                    continue
+            groups.append((group, vertex_list))
+        return vertex_lists, groups
+
+    def debug_draw(self):
+        for body in self.level_actor.world.bodyList:
+            self.debug_draw_body(body)
+        for joint in self.level_actor.world.jointList:
+            if isinstance(joint, b2.b2DistanceJoint):
+                glBegin(GL_LINES)
+                glVertex2f(*joint.GetAnchor1().tuple())
+                glVertex2f(*joint.GetAnchor2().tuple())
+                glEnd()
+        for spring_actor in self.level_actor.spring_actors:
+            glBegin(GL_LINES)
+            glVertex2f(*spring_actor.anchor_1.tuple())
+            glVertex2f(*spring_actor.anchor_2.tuple())
+            glEnd()
+
+    def debug_draw_body(self, body):
+        glPushMatrix()
+        x, y = body.position.tuple()
+        glTranslatef(x, y, 0)
+        glRotatef(body.angle * 180 / math.pi, 0, 0, 1)
+        for shape in body.shapeList:
+            if isinstance(shape, b2.b2PolygonShape):
+                glBegin(GL_LINE_LOOP)
+                for x, y in shape.vertices:
+                    glVertex2f(x, y)
+                glEnd()
+            elif isinstance(shape, b2.b2CircleShape):
+                display_list = self.get_circle_display_list(shape.radius)
+                display_list.draw(shape.localPosition.tuple(), shape.radius)
+        glPopMatrix()
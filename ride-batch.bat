@@ -0,0 +1,3 @@
+set PYTHONPATH=lib:%PYTHONPATH%
+
+python -O -m ride.batch %*
@@ -0,0 +1,5 @@
+#!/bin/sh
+
+export PYTHONPATH=lib:$PYTHONPATH
+
+python -O -m ride.benchmark "$@"